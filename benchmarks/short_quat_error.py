@@ -0,0 +1,51 @@
+"""Round trip error of the int16 short quaternion encoding used by v11 ANI and .anim rotation tracks.
+
+Encodes random unit quaternions with common.encode_short_quats, decodes them back and prints the
+largest component error and the largest rotation angle error:
+
+    python benchmarks/short_quat_error.py
+    python benchmarks/short_quat_error.py --count 100000 --seed 1
+"""
+
+import argparse
+import importlib
+
+import numpy as np
+
+from stripify_bench import load_types
+
+
+def short_quats_error(common, values: np.ndarray):
+    values = np.asarray(values, dtype=np.float64).reshape(-1, 4)
+    if len(values) == 0:
+        return 0.0, 0.0
+
+    decoded = common.decode_short_quats(common.encode_short_quats(values)).astype(np.float64)
+    component_error = np.abs(decoded - values).max()
+
+    decoded /= np.linalg.norm(decoded, axis=1, keepdims=True)
+    dots = np.abs(np.einsum("ij,ij->i", decoded, values / np.linalg.norm(values, axis=1, keepdims=True)))
+    angle_error = 2 * np.arccos(np.minimum(dots, 1.0)).max()
+
+    return float(component_error), float(angle_error)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=1000000, help="number of random unit quaternions")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    load_types()
+    common = importlib.import_module("dragon_nest_types.common")
+
+    values = np.random.default_rng(args.seed).normal(size=(args.count, 4))
+    values /= np.linalg.norm(values, axis=1, keepdims=True)
+
+    component_error, angle_error = short_quats_error(common, values)
+    print(f"max component error  {component_error:.3g}")
+    print(f"max angle error      {angle_error:.3g} rad ({np.degrees(angle_error):.3g} degrees)")
+
+
+if __name__ == "__main__":
+    main()
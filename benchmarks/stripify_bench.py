@@ -0,0 +1,189 @@
+"""Speed and quality benchmark of the stripifier backends in tristrip.STRIPIFIERS.
+
+Runs every backend on generated grids, spheres, fragmented and degenerate-heavy meshes and writes
+one JSON document with a record per mesh and backend, so results can be compared between runs:
+
+    python benchmarks/stripify_bench.py -o bench.json
+    python benchmarks/stripify_bench.py --sizes 1000 10000 --backends greedy
+"""
+
+import argparse
+import importlib
+import importlib.util
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+TYPES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "io_scene_dragon_nest", "types")
+
+
+# load_types imports the types package under an alias, the add-on package itself needs bpy
+def load_types(name="dragon_nest_types"):
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_loader(name, loader=None, is_package=True)
+        package = importlib.util.module_from_spec(spec)
+        package.__path__ = [os.path.normpath(TYPES_DIR)]
+        sys.modules[name] = package
+
+    tristrip = importlib.import_module(name + ".pyffi.utils.tristrip")
+    meshopt = importlib.import_module(name + ".meshopt")
+    return tristrip, meshopt
+
+
+def grid_faces(size: int) -> np.ndarray:
+    side = max(1, int(np.ceil(np.sqrt(size / 2))))
+    rows, cols = np.divmod(np.arange(side * side), side)
+    v0 = rows * (side + 1) + cols
+    v1, v2, v3 = v0 + side + 1, v0 + 1, v0 + side + 2
+    faces = np.stack([np.stack([v0, v1, v2], axis=1), np.stack([v2, v1, v3], axis=1)], axis=1)
+    return faces.reshape(-1, 3)[:size]
+
+
+def sphere_faces(size: int) -> np.ndarray:
+    # a uv sphere, rings of quads between two triangle fans around the poles
+    segments = max(3, int(np.sqrt(size)))
+    rings = max(2, size // (2 * segments) + 1)
+
+    south, north = 0, 1 + (rings - 1) * segments
+    ring_vertex = lambda ring, segment: 1 + ring * segments + segment % segments
+
+    segment = np.arange(segments)
+    faces = [np.stack([np.full(segments, south), ring_vertex(0, segment + 1), ring_vertex(0, segment)], axis=1)]
+    for ring in range(rings - 2):
+        a, b = ring_vertex(ring, segment), ring_vertex(ring, segment + 1)
+        c, d = ring_vertex(ring + 1, segment), ring_vertex(ring + 1, segment + 1)
+        faces.append(np.stack([a, b, c], axis=1))
+        faces.append(np.stack([c, b, d], axis=1))
+    top = rings - 2
+    faces.append(np.stack([np.full(segments, north), ring_vertex(top, segment), ring_vertex(top, segment + 1)], axis=1))
+    return np.concatenate(faces)[:size]
+
+
+def fragmented_faces(size: int, rng) -> np.ndarray:
+    # a grid with two thirds of its triangles removed at random leaves many small islands
+    faces = grid_faces(size * 3)
+    return faces[np.sort(rng.permutation(len(faces))[:size])]
+
+
+def degenerate_faces(size: int, rng) -> np.ndarray:
+    # a quarter of the triangles repeat a vertex and a tenth are duplicates, like raw game exports
+    faces = grid_faces(size).copy()
+    degenerate = rng.random(len(faces)) < 0.25
+    faces[degenerate, 2] = faces[degenerate, 0]
+    duplicates = rng.choice(len(faces), size=len(faces) // 10)
+    faces = np.concatenate([faces, faces[duplicates]])[:size]
+    return faces[rng.permutation(len(faces))]
+
+
+MESHES = {
+    "grid": lambda size, rng: grid_faces(size),
+    "sphere": lambda size, rng: sphere_faces(size),
+    "fragmented": fragmented_faces,
+    "degenerate": degenerate_faces,
+}
+
+
+def measure(tristrip, meshopt, stripify, faces: np.ndarray, track_memory: bool) -> dict:
+    triangles = faces.tolist()
+
+    if track_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+    strips = stripify(triangles)
+    stripify_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stitched = tristrip.stitch_strips(strips)
+    stitch_seconds = time.perf_counter() - start
+
+    peak_memory = None
+    if track_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    decoded = tristrip.triangulate_array(stitched)
+    strip_triangles = max(len(stitched) - 2, 0)
+    missing, extra = tristrip.compare_strips(faces, [stitched])
+
+    return {
+        "stripify_seconds": stripify_seconds,
+        "stitch_seconds": stitch_seconds,
+        "seconds": stripify_seconds + stitch_seconds,
+        "peak_memory_bytes": peak_memory,
+        "strips": len(strips),
+        "stitched_indices": len(stitched),
+        "list_indices": 3 * len(triangles),
+        "degenerate_ratio": (strip_triangles - len(decoded)) / strip_triangles if strip_triangles else 0.0,
+        "acmr": meshopt.acmr(decoded),
+        "missing_faces": len(missing),
+        "extra_faces": len(extra),
+    }
+
+
+def environment(tristrip) -> dict:
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "backends": [name for name, _, _ in tristrip.STRIPIFIERS],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 200000],
+                        help="triangle counts of the generated meshes")
+    parser.add_argument("--meshes", nargs="+", choices=sorted(MESHES), default=list(MESHES))
+    parser.add_argument("--backends", nargs="+", help="stripifier names, all of tristrip.STRIPIFIERS by default")
+    parser.add_argument("--reference-limit", type=int, default=50000,
+                        help="skip the NvTriStrip port above this many triangles, it takes minutes")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the second run that measures peak memory with tracemalloc")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the JSON here instead of to stdout")
+    args = parser.parse_args(argv)
+
+    tristrip, meshopt = load_types()
+    backends = args.backends or [name for name, _, _ in tristrip.STRIPIFIERS]
+
+    results = []
+    for mesh_name in args.meshes:
+        for size in args.sizes:
+            faces = MESHES[mesh_name](size, np.random.default_rng(args.seed))
+
+            for backend in backends:
+                record = {"mesh": mesh_name, "triangles": len(faces), "backend": backend}
+
+                if backend == "nvtristrip" and len(faces) > args.reference_limit:
+                    record["skipped"] = f"more than {args.reference_limit} triangles"
+                    results.append(record)
+                    continue
+
+                stripify = tristrip.get_stripifier(len(faces), backend)
+                record.update(measure(tristrip, meshopt, stripify, faces, False))
+                if not args.no_memory:
+                    record["peak_memory_bytes"] = measure(tristrip, meshopt, stripify, faces, True)["peak_memory_bytes"]
+
+                results.append(record)
+                print(f"{mesh_name:>10} {len(faces):>7} {backend:>10} {record['seconds']:8.3f}s "
+                      f"{record['stitched_indices']:>8} indices  acmr {record['acmr']:.3f}", file=sys.stderr)
+
+    document = {"environment": environment(tristrip), "results": results}
+    if args.output:
+        with open(args.output, mode="w") as file:
+            json.dump(document, file, indent=1)
+    else:
+        json.dump(document, sys.stdout, indent=1)
+        print()
+
+
+if __name__ == "__main__":
+    main()
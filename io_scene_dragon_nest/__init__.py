@@ -1,6 +1,13 @@
-import bpy
+from .types.pyffi.utils import tristrip
 
-from .gui import gui
+# NOTE: exporter worker processes are spawned in Blender's Python without bpy and import this package
+# on the way to the types package, so the add-on only sets itself up when running inside Blender
+try:
+    import bpy
+except ImportError:
+    bpy = None
+else:
+    from .gui import gui
 
 bl_info = {
     "name": "Import Dragon Nest Model / Animation",
@@ -15,7 +22,7 @@ bl_info = {
     "category": "Import-Export"
 }
 
-classes = (
+classes = () if bpy is None else (
     gui.DN_Import,
     gui.DN_ExportSKN,
     gui.DN_ExportMSH,
@@ -43,6 +50,10 @@ def draw_3d_callback():
 
 
 def register():
+    # before Blender 2.91 sys.executable is Blender itself, the worker processes need its Python
+    if bpy.app.version < (2, 91, 0):
+        tristrip.worker_executable = bpy.app.binary_path_python
+
     for cls in classes:
         bpy.utils.register_class(cls)
 
@@ -62,6 +73,8 @@ def unregister():
     for cls in classes:
         bpy.utils.unregister_class(cls)
 
+    tristrip.worker_executable = None
+
 
 if __name__ == "__main__":
     register()
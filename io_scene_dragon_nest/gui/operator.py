@@ -24,7 +24,7 @@ class DN_AnimChooserBox(bpy.types.Operator):
             return []
 
         items = [("0", "*All*", "", 0)]
-        for i, name in enumerate(ani_imp.ani.names):
+        for i, name in enumerate(ani_imp.info.names):
             items.append((str(i+1), name, "", i+1))
 
         return items
@@ -143,6 +143,42 @@ class DN_ExportSKN(bpy.types.Operator, ExportHelper):
         default = True,
     )
 
+    optimize_vertex_cache: BoolProperty(
+        name = "Optimize Vertex Cache",
+        description = "Reorder triangles for the GPU vertex cache and report the cache miss ratio before and after",
+        default = False,
+    )
+
+    optimize_vertex_fetch: BoolProperty(
+        name = "Optimize Vertex Fetch",
+        description = "Renumber vertices in the order the triangles first use them",
+        default = False,
+    )
+
+    verify_strips: BoolProperty(
+        name = "Verify Triangle Strips",
+        description = "Check that every triangle strip decodes to exactly the faces of its mesh",
+        default = False,
+    )
+
+    strip_workers: IntProperty(
+        name = "Strip Workers",
+        description = "Processes that stripify each mesh in spatial clusters, 0 for one per CPU core. "
+                      "1 stripifies whole meshes in Blender, which gives the fewest strip indices. "
+                      "Only used when Mesh Workers is 1",
+        default = 1,
+        min = 0,
+    )
+
+    mesh_workers: IntProperty(
+        name = "Mesh Workers",
+        description = "Processes that stripify whole meshes side by side, 0 for one per CPU core. "
+                      "1 stripifies the meshes one after another in Blender. Other values ignore "
+                      "Strip Workers, so no more than this many processes run",
+        default = 1,
+        min = 0,
+    )
+
     def execute(self, context):
         filepath = self.filepath
         options = {
@@ -150,12 +186,21 @@ class DN_ExportSKN(bpy.types.Operator, ExportHelper):
             "msh_version": int(self.msh_version),
             "msh_name": self.msh_name,
             "apply_root_transform": self.apply_root_transform,
+            "optimize_vertex_cache": self.optimize_vertex_cache,
+            "optimize_vertex_fetch": self.optimize_vertex_fetch,
+            "verify_strips": self.verify_strips,
+            "strip_workers": self.strip_workers or None,
+            "mesh_workers": self.mesh_workers or None,
         }
 
         from ..ops import skn_exporter
-        if not skn_exporter.save(context, filepath, options):
+        exporter = skn_exporter.save(context, filepath, options)
+        if not exporter:
             return {'CANCELLED'}
 
+        for line in exporter.report:
+            self.report({'INFO'}, line)
+
         return {'FINISHED'}
 
 
@@ -184,17 +229,62 @@ class DN_ExportMSH(bpy.types.Operator, ExportHelper):
         default = True,
     )
 
+    optimize_vertex_cache: BoolProperty(
+        name = "Optimize Vertex Cache",
+        description = "Reorder triangles for the GPU vertex cache and report the cache miss ratio before and after",
+        default = False,
+    )
+
+    optimize_vertex_fetch: BoolProperty(
+        name = "Optimize Vertex Fetch",
+        description = "Renumber vertices in the order the triangles first use them",
+        default = False,
+    )
+
+    verify_strips: BoolProperty(
+        name = "Verify Triangle Strips",
+        description = "Check that every triangle strip decodes to exactly the faces of its mesh",
+        default = False,
+    )
+
+    strip_workers: IntProperty(
+        name = "Strip Workers",
+        description = "Processes that stripify each mesh in spatial clusters, 0 for one per CPU core. "
+                      "1 stripifies whole meshes in Blender, which gives the fewest strip indices. "
+                      "Only used when Mesh Workers is 1",
+        default = 1,
+        min = 0,
+    )
+
+    mesh_workers: IntProperty(
+        name = "Mesh Workers",
+        description = "Processes that stripify whole meshes side by side, 0 for one per CPU core. "
+                      "1 stripifies the meshes one after another in Blender. Other values ignore "
+                      "Strip Workers, so no more than this many processes run",
+        default = 1,
+        min = 0,
+    )
+
     def execute(self, context):
         filepath = self.filepath
         options = {
             "msh_version": int(self.msh_version),
             "apply_root_transform": self.apply_root_transform,
+            "optimize_vertex_cache": self.optimize_vertex_cache,
+            "optimize_vertex_fetch": self.optimize_vertex_fetch,
+            "verify_strips": self.verify_strips,
+            "strip_workers": self.strip_workers or None,
+            "mesh_workers": self.mesh_workers or None,
         }
 
         from ..ops import msh_exporter
-        if not msh_exporter.save(context, filepath, options):
+        exporter = msh_exporter.save(context, filepath, options)
+        if not exporter:
             return {'CANCELLED'}
 
+        for line in exporter.report:
+            self.report({'INFO'}, line)
+
         return {'FINISHED'}
 
 
@@ -241,7 +331,11 @@ class DN_ExportANI(bpy.types.Operator, ExportHelper):
         }
 
         from ..ops import ani_exporter
-        if not ani_exporter.save(context, filepath, options):
+        try:
+            if not ani_exporter.save(context, filepath, options):
+                return {'CANCELLED'}
+        except ValueError as e:
+            self.report({'ERROR'}, str(e))
             return {'CANCELLED'}
 
         return {'FINISHED'}
@@ -47,7 +47,11 @@ class OBJECT_PT_DNObjects(bpy.types.Panel):
         box.label(text="Mesh")
 
         box.prop(settings, "parent_name", text="Parent")
-        box.prop(settings, "use_tristrip", text="Use Triangle Strip")
+        box.prop(settings, "auto_tristrip", text="Auto Triangle Strip")
+
+        row = box.row()
+        row.enabled = not settings.auto_tristrip
+        row.prop(settings, "use_tristrip", text="Use Triangle Strip")
 
     def draw_empty_menu(self, context):
         layout = self.layout
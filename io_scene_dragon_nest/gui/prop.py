@@ -148,6 +148,12 @@ class DN_ObjectProps(bpy.types.PropertyGroup):
         default = True
     )
 
+    auto_tristrip: bpy.props.BoolProperty(
+        name = "Auto Triangle Strip",
+        description="Export as Triangle Strip or Triangle List, whichever has fewer indices",
+        default = False
+    )
+
     def draw_bbox(context):
         obj = context.object
         if not obj:
@@ -8,7 +8,7 @@ from .common import unoriented_matrix, translation_matrix, rotation_matrix, scal
 from .common import get_active_armature_object, get_armature_matrices
 from ..gui import gui
 from ..types import common
-from ..types.ani import ANI, AnimationBone, Animation, KeyFrame
+from ..types.ani import ANI, AnimationBone, Animation, KeyFrame, KeyTrack
 
 
 def basis_to_local_matrix(basis_matrix, global_matrix, parent_matrix):
@@ -236,9 +236,9 @@ class AniExporter:
                     base_location,
                     base_rotation,
                     base_scale,
-                    locations,
-                    rotations,
-                    scales
+                    KeyTrack.from_keyframes(locations, 3),
+                    KeyTrack.from_keyframes(rotations, 4),
+                    KeyTrack.from_keyframes(scales, 3),
                 ))
 
             self.ani.bones.append(AnimationBone(bone_name, bone_parent, ani_animations))
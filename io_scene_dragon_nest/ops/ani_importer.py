@@ -6,7 +6,8 @@ from typing import List
 
 from .common import oriented_matrix, translation_matrix, rotation_matrix, scale_matrix, get_armature_matrices
 from ..gui import gui
-from ..types.ani import ANI, ANIM, AnimationBone
+from ..types import ani
+from ..types.ani import ANIM, AnimationBone, LazyANI
 
 ANIM_ID_ALL = -1
 
@@ -63,10 +64,13 @@ def create_actions(armature_object, animation_bones: List[AnimationBone], anim_i
         def_mat = def_matrices[bone.name]
         parent_def_mat = def_matrices[bone.parent.name] if bone.parent else Matrix()
 
-        for act_idx, anim in enumerate(ani_bone.animations):
-            if anim_id not in (ANIM_ID_ALL, act_idx):
-                continue
+        # NOTE: only the chosen animation is accessed, so lazily loaded files decode just that one
+        if anim_id == ANIM_ID_ALL:
+            bone_anims = enumerate(ani_bone.animations)
+        else:
+            bone_anims = [(anim_id, ani_bone.animations[anim_id])]
 
+        for act_idx, anim in bone_anims:
             act = actions.get(act_idx) or bpy.data.actions.new("dn_animation %d" % act_idx)
             actions[act_idx] = act
 
@@ -96,21 +100,21 @@ def create_actions(armature_object, animation_bones: List[AnimationBone], anim_i
             set_keyframe(fcurves_rotation, 0, mat_basis.to_quaternion())
             set_keyframe(fcurves_scale, 0, mat_basis.to_scale())
 
-            for kf in anim.locations:
-                mat = translation_matrix((kf.value.x, kf.value.z, kf.value.y))
+            for frame, (x, y, z) in zip(anim.locations.frames.tolist(), anim.locations.values.tolist()):
+                mat = translation_matrix((x, z, y))
                 mat_basis = local_to_basis_matrix(mat, def_mat, parent_def_mat)
-                set_keyframe(fcurves_location, kf.frame, mat_basis.to_translation())
+                set_keyframe(fcurves_location, frame, mat_basis.to_translation())
 
-            for kf in anim.rotations:
-                rot = Quaternion((kf.value.w, kf.value.x, kf.value.y, kf.value.z))
+            for frame, (x, y, z, w) in zip(anim.rotations.frames.tolist(), anim.rotations.values.tolist()):
+                rot = Quaternion((w, x, y, z))
                 mat = oriented_matrix(rotation_matrix(rot))
                 mat_basis = local_to_basis_matrix(mat, def_mat, parent_def_mat)
-                set_keyframe(fcurves_rotation, kf.frame, mat_basis.to_quaternion())
+                set_keyframe(fcurves_rotation, frame, mat_basis.to_quaternion())
 
-            for kf in anim.scales:
-                mat = scale_matrix((kf.value.x, kf.value.z, kf.value.y))
+            for frame, (x, y, z) in zip(anim.scales.frames.tolist(), anim.scales.values.tolist()):
+                mat = scale_matrix((x, z, y))
                 mat_basis = local_to_basis_matrix(mat, def_mat, parent_def_mat)
-                set_keyframe(fcurves_scale, kf.frame, mat_basis.to_scale())
+                set_keyframe(fcurves_scale, frame, mat_basis.to_scale())
 
     return actions
 
@@ -122,17 +126,22 @@ class AniImporter:
         if anim_id is None:
             anim_id = ANIM_ID_ALL
         elif anim_id != ANIM_ID_ALL:
-            anim_id = max(0, min(anim_id, len(self.ani.names) - 1))
+            anim_id = max(0, min(anim_id, len(self.info.names) - 1))
 
         arm_obj = get_active_armature(context)
         if not arm_obj:
             return
 
-        arm = arm_obj.data
-        if not connect_armature_bones(context, arm, self.ani.bones):
-            return
+        self.ani = LazyANI()
+        with self.ani:
+            self.ani.load_file(self.filename)
+
+            arm = arm_obj.data
+            if not connect_armature_bones(context, arm, self.ani.bones):
+                return
+
+            actions = create_actions(arm_obj, self.ani.bones, anim_id)
 
-        actions = create_actions(arm_obj, self.ani.bones, anim_id)
         for act_idx in sorted(actions):
             act = actions[act_idx]
             act.name = self.ani.names[act_idx]
@@ -146,17 +155,20 @@ class AniImporter:
 
         self.imported = True
 
+    # NOTE: only the header is read here, the animations are loaded once one is chosen
     def load_file(self, context, filename) -> bool:
-        self.ani = ANI()
-        self.ani.load_file(filename)
+        self.info = ani.probe(filename)
 
-        if not self.ani.file_type.startswith("Eternity Engine Ani File"):
+        if not self.info:
             context.window_manager.popup_menu(gui.invalid_ani_type, title='Error', icon='ERROR')
             return False
 
+        self.filename = filename
         return True
 
     def __init__(self):
+        self.filename = ""
+        self.info = None
         self.ani = None
         self.actions = []
         self.imported = False
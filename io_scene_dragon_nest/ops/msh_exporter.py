@@ -1,13 +1,15 @@
 import bmesh
 import bpy
+import numpy as np
 
 from mathutils import Matrix
 
 from .common import unoriented_matrix, translation_matrix, scale_matrix, get_active_armature_object
 from ..gui import gui
-from ..types import common
-from ..types.msh import MSH, Bone, Collision, Dummy, Mesh, CollisionType
-from ..types.msh import PrimitiveBox, PrimitiveSphere, PrimitiveCapsule, PrimitiveTriangleList, PrimitiveTriangle
+from ..types import common, meshopt
+from ..types.msh import MSH, Bone, Collision, Dummy, Mesh, CollisionType, stripify_meshes
+from ..types.msh import PrimitiveBox, PrimitiveSphere, PrimitiveCapsule, PrimitiveTriangleList
+from ..types.pyffi.utils import tristrip
 
 
 class MshExportException(Exception):
@@ -130,10 +132,10 @@ class MshExporter:
                     co2 = mesh.vertices[polygon.vertices[1]].co - co1
                     co3 = mesh.vertices[polygon.vertices[2]].co - co1
 
-                    triangles.append(PrimitiveTriangle(
-                        common.Vector3D(co1.x, co1.z, co1.y),
-                        common.Vector3D(co3.x, co3.z, co3.y),
-                        common.Vector3D(co2.x, co2.z, co2.y),
+                    triangles.append((
+                        (co1.x, co1.z, co1.y),
+                        (co3.x, co3.z, co3.y),
+                        (co2.x, co2.z, co2.y),
                     ))
 
             collision.primitive = PrimitiveTriangleList(triangles)
@@ -168,70 +170,150 @@ class MshExporter:
         if bpy.app.version < (4, 1, 0):
             mesh.calc_normals_split()
 
-        for _ in range(len(mesh.uv_layers)):
-            msh_mesh.uvs.append([])
-
         vertex_group_indices = {}
         for idx, vg in enumerate(obj.vertex_groups):
             if vg.name in arm_obj.data.bones:
                 vertex_group_indices[idx] = len(msh_mesh.rig_names)
                 msh_mesh.rig_names.append(vg.name)
 
-        vertices_indices = {}
-
-        for polygon in mesh.polygons:
-            face = []
+        polygons_num, loops_num = len(mesh.polygons), len(mesh.loops)
+
+        loop_starts = np.empty(polygons_num, dtype=np.int32)
+        mesh.polygons.foreach_get("loop_start", loop_starts)
+        loop_indices = (loop_starts[:, np.newaxis] + np.arange(3)).ravel()
+
+        loop_vertex_indices = np.empty(loops_num, dtype=np.int32)
+        mesh.loops.foreach_get("vertex_index", loop_vertex_indices)
+        loop_vertex_indices = loop_vertex_indices[loop_indices]
+
+        loop_normals = np.empty(loops_num * 3, dtype=np.float32)
+        mesh.loops.foreach_get("normal", loop_normals)
+        loop_normals = loop_normals.reshape(-1, 3)[loop_indices]
+
+        loop_uvs = []
+        for uv_layer in mesh.uv_layers:
+            uvs = np.empty(loops_num * 2, dtype=np.float32)
+            uv_layer.data.foreach_get("uv", uvs)
+            loop_uvs.append(uvs.reshape(-1, 2)[loop_indices])
+
+        # Loops share a vertex when they have the same vertex index, rounded normal and uvs.
+        # Adding 0.0 folds -0.0 into 0.0 so that equal uvs have equal bits.
+        key = [
+            loop_vertex_indices[:, np.newaxis],
+            np.rint(loop_normals.astype(np.float64) / 0.3).astype(np.int64),
+        ]
+        for uvs in loop_uvs:
+            key.append((uvs + np.float32(0.0)).view(np.int32))
+        key = np.hstack(key).astype(np.int64)
+
+        _, first_loops, loop_vertices = np.unique(key, axis=0, return_index=True, return_inverse=True)
+
+        # Number vertices in the order they are first seen
+        order = np.argsort(first_loops)
+        first_loops = first_loops[order]
+        vertex_ranks = np.empty_like(order)
+        vertex_ranks[order] = np.arange(len(order))
+        loop_vertices = vertex_ranks[loop_vertices.reshape(-1)]
+
+        coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+        mesh.vertices.foreach_get("co", coords)
+        coords = coords.reshape(-1, 3)
+
+        vertex_indices = loop_vertex_indices[first_loops]
+        msh_mesh.vertices = coords[vertex_indices][:, (0, 2, 1)]
+        msh_mesh.normals = loop_normals[first_loops][:, (0, 2, 1)]
+
+        uv_layers = []
+        for uvs in loop_uvs:
+            uvs = uvs[first_loops].astype(np.float64)
+            uvs[:, 1] = 1 - uvs[:, 1]
+            uv_layers.append(uvs)
+        msh_mesh.uvs = uv_layers
+
+        msh_mesh.faces = loop_vertices.reshape(-1, 3)[:, (0, 2, 1)]
+
+        if vertex_group_indices:
+            rig_indices = np.zeros((len(mesh.vertices), 4), dtype=np.int16)
+            rig_weights = np.zeros((len(mesh.vertices), 4), dtype=np.float32)
+
+            for vertex in mesh.vertices:
+                groups_num = 0
+                for group in vertex.groups:
+                    # Only upto 4 vertices per group are supported
+                    if groups_num >= 4:
+                        break
+
+                    if group.weight > 0:
+                        rig_indices[vertex.index, groups_num] = vertex_group_indices[group.group]
+                        rig_weights[vertex.index, groups_num] = group.weight
+                        groups_num += 1
+
+            msh_mesh.rig_indices = rig_indices[vertex_indices]
+            msh_mesh.rig_weights = rig_weights[vertex_indices]
 
-            for loop_index in polygon.loop_indices:
-                loop = mesh.loops[loop_index]
-                vertex = mesh.vertices[loop.vertex_index]
-                uvs = [tuple(uv_layer.data[loop_index].uv) for uv_layer in mesh.uv_layers]
-                normal = loop.normal
-
-                key = (loop.vertex_index,
-                       tuple(round(n / 0.3) * 0.3 for n in normal),
-                       tuple(uv for uv in uvs))
+        # Check vertices count again since duplicate vertices may have increased
+        # vertices count above the limit
+        if len(msh_mesh.vertices) > 0xFFFF:
+            raise MshExportException(f"Too many vertices in mesh ({obj.name}): {len(msh_mesh.vertices)}/65535")
 
-                if key not in vertices_indices:
-                    vertex_index = len(msh_mesh.vertices)
-                    msh_mesh.vertices.append((vertex.co.x, vertex.co.z, vertex.co.y))
-                    msh_mesh.normals.append((normal.x, normal.z, normal.y))
+        return msh_mesh
 
-                    for uv_idx, uv in enumerate(uvs):
-                        msh_mesh.uvs[uv_idx].append((uv[0], 1 - uv[1]))
+    # optimize_vertex_cache reorders the faces of the mesh for the post-transform cache and returns a report line
+    @staticmethod
+    def optimize_vertex_cache(msh_mesh) -> str:
+        acmr_before = meshopt.acmr(msh_mesh.faces)
+        msh_mesh.faces = meshopt.tipsify(msh_mesh.faces, len(msh_mesh.vertices))
+        acmr_after = meshopt.acmr(msh_mesh.faces)
 
-                    if vertex_group_indices:
-                        rig_indices, rig_weights = [], []
-                        for group in vertex.groups:
-                            # Only upto 4 vertices per group are supported
-                            if len(rig_indices) >= 4:
-                                break
+        return f"{msh_mesh.name}: ACMR {acmr_before:.3f} -> {acmr_after:.3f}"
 
-                            if group.weight > 0:
-                                rig_indices.append(vertex_group_indices[group.group])
-                                rig_weights.append(group.weight)
+    # choose_index_encoding picks triangle strip or list for the mesh, whichever is smaller, and returns a report line
+    @staticmethod
+    def choose_index_encoding(msh_mesh, strip) -> str:
+        strip_num, list_num = msh_mesh.choose_encoding(strip=strip)
+        encoding = "triangle strip" if msh_mesh.use_tristrip else "triangle list"
 
-                        while len(rig_indices) < 4:
-                            rig_indices.append(0)
-                            rig_weights.append(0)
+        return f"{msh_mesh.name}: {encoding} ({strip_num} strip / {list_num} list indices)"
 
-                        msh_mesh.rig_indices.append(rig_indices)
-                        msh_mesh.rig_weights.append(rig_weights)
+    # optimize_vertex_fetch renumbers the vertices of the mesh by first use in its encoded indices,
+    # the renumbered indices are kept on the mesh so that saving writes them instead of encoding again
+    @staticmethod
+    def optimize_vertex_fetch(msh_mesh):
+        msh_mesh.indices = msh_mesh.encode_indices()
+        msh_mesh.reorder_vertices(meshopt.fetch_order(msh_mesh.indices, len(msh_mesh.vertices)))
 
-                    face.append(vertex_index)
-                    vertices_indices[key] = vertex_index
+    # verify_strip decodes the triangle strip of the mesh and checks that it has exactly the faces of the mesh,
+    # the strip is kept as the indices of the mesh so that saving writes the strip that was checked
+    @staticmethod
+    def verify_strip(msh_mesh) -> str:
+        msh_mesh.indices = msh_mesh.encode_indices()
+        missing, extra = tristrip.compare_strips(msh_mesh.faces, [msh_mesh.indices])
+        if len(missing) > 0 or len(extra) > 0:
+            raise MshExportException(
+                f"Triangle strip does not match faces in mesh ({msh_mesh.name}): "
+                f"{len(missing)} missing, {len(extra)} extra"
+            )
 
-                else:
-                    face.append(vertices_indices[key])
+        return f"{msh_mesh.name}: triangle strip verified"
 
-            msh_mesh.faces.append((face[0], face[2], face[1]))
+    # encode_meshes settles the indices of the exported meshes, their strips are made first, all together so that
+    # mesh_workers processes can share them, then each mesh gets its encoding, vertex order and strip check
+    def encode_meshes(self, options):
+        strip_workers, mesh_workers = options.get("strip_workers", 1), options.get("mesh_workers", 1)
 
-        # Check vertices count again since duplicate vertices may have increased
-        # vertices count above the limit
-        if len(vertices_indices) > 0xFFFF:
-            raise MshExportException(f"Too many vertices in mesh ({obj.name}): {len(vertices_indices)}/65535")
+        auto_tristrip = [obj.dragon_nest.auto_tristrip for obj in self.mesh_objects]
+        strip_meshes = [mesh for mesh, auto in zip(self.msh.meshes, auto_tristrip) if auto or mesh.use_tristrip]
+        strips = dict(zip(map(id, strip_meshes), stripify_meshes(strip_meshes, mesh_workers, strip_workers)))
 
-        return msh_mesh
+        for mesh, auto in zip(self.msh.meshes, auto_tristrip):
+            if auto:
+                self.report.append(MshExporter.choose_index_encoding(mesh, strips[id(mesh)]))
+            elif mesh.use_tristrip:
+                mesh.indices = strips[id(mesh)]
+            if options.get("optimize_vertex_fetch"):
+                MshExporter.optimize_vertex_fetch(mesh)
+            if options.get("verify_strips") and mesh.use_tristrip:
+                self.report.append(MshExporter.verify_strip(mesh))
 
     def export_data(self, context, options):
         arm_obj, version = options["armature_object"], options["version"]
@@ -267,6 +349,8 @@ class MshExporter:
                 # mesh
                 if obj.type == 'MESH':
                     mesh = MshExporter.export_mesh(context, obj, arm_obj, apply_root_transform)
+                    if options.get("optimize_vertex_cache"):
+                        self.report.append(MshExporter.optimize_vertex_cache(mesh))
                     self.msh.meshes.append(mesh)
                     self.mesh_objects.append(obj)
 
@@ -280,9 +364,12 @@ class MshExporter:
                 collision = MshExporter.export_collision(context, obj, apply_root_transform)
                 self.msh.collisions.append(collision)
 
+        self.encode_meshes(options)
+
     def __init__(self):
         self.msh = MSH()
         self.mesh_objects = []
+        self.report = []
 
 
 def save(context, filepath, options):
@@ -295,10 +382,15 @@ def save(context, filepath, options):
         "version": options["msh_version"],
         "armature_object": arm_obj,
         "apply_root_transform": options["apply_root_transform"],
+        "optimize_vertex_cache": options["optimize_vertex_cache"],
+        "optimize_vertex_fetch": options["optimize_vertex_fetch"],
+        "verify_strips": options["verify_strips"],
+        "strip_workers": options["strip_workers"],
+        "mesh_workers": options["mesh_workers"],
     }
 
     msh_exporter = MshExporter()
     msh_exporter.export_data(context, msh_options)
-    msh_exporter.msh.save_file(filepath)
+    msh_exporter.msh.save_file(filepath, options["strip_workers"], options["mesh_workers"])
 
     return msh_exporter
@@ -1,5 +1,5 @@
 import bpy
-import bmesh
+import numpy as np
 
 from mathutils import Matrix, Vector
 
@@ -79,29 +79,26 @@ class MshImporter:
         for msh_mesh in self.msh.meshes:
             mesh = bpy.data.meshes.new(msh_mesh.name)
 
-            vertices = tuple((v[0], v[2], v[1]) for v in msh_mesh.vertices)
-            faces = tuple((f[0], f[2], f[1]) for f in msh_mesh.faces)
-            normals = tuple((n[0], n[2], n[1]) for n in msh_mesh.normals)
+            vertices = msh_mesh.vertices[:, (0, 2, 1)]
+            faces = msh_mesh.faces[:, (0, 2, 1)]
+            normals = msh_mesh.normals[:, (0, 2, 1)]
 
-            mesh.from_pydata(vertices, [], faces)
+            # NOTE: Mesh.from_pydata checks faces for truthiness, so it gets a list
+            mesh.from_pydata(vertices, [], faces.tolist())
             if bpy.app.version < (4, 1, 0):
                 mesh.use_auto_smooth = True
             mesh.normals_split_custom_set_from_vertices(normals)
 
-            bm = bmesh.new()
-            bm.from_mesh(mesh)
-            bm.faces.ensure_lookup_table()
+            loop_vertex_indices = np.empty(len(mesh.loops), dtype=np.int32)
+            mesh.loops.foreach_get("vertex_index", loop_vertex_indices)
 
             for uvs in msh_mesh.uvs:
-                uv_layer = bm.loops.layers.uv.new()
+                uv_layer = mesh.uv_layers.new()
 
-                for face in bm.faces:
-                    for loop in face.loops:
-                        vert_index = loop.vert.index
-                        uv = uvs[vert_index]
-                        loop[uv_layer].uv = (uv[0], 1 - uv[1])
+                loop_uvs = uvs[loop_vertex_indices]
+                loop_uvs[:, 1] = 1 - loop_uvs[:, 1]
+                uv_layer.data.foreach_set("uv", loop_uvs.ravel())
 
-            bm.to_mesh(mesh)
             mesh.validate()
             mesh.update()
 
@@ -112,12 +109,12 @@ class MshImporter:
             mesh_obj.parent = arm_obj
             collection.objects.link(mesh_obj)
 
-            if msh_mesh.rig_indices:
+            if len(msh_mesh.rig_indices) > 0:
                 modifier = mesh_obj.modifiers.new(type='ARMATURE', name="Armature")
                 modifier.object = arm_obj
 
-                rig_indices = msh_mesh.rig_indices
-                rig_weights = msh_mesh.rig_weights
+                rig_indices = msh_mesh.rig_indices.tolist()
+                rig_weights = msh_mesh.rig_weights.tolist()
 
                 vert_groups = [mesh_obj.vertex_groups.new(name=name) for name in msh_mesh.rig_names]
                 for i in range(len(msh_mesh.vertices)):
@@ -186,19 +183,15 @@ class MshImporter:
                     col_obj.matrix_local = oriented_matrix(loc_mat @ rot_mat @ scl_mat)
 
                 elif msh_collision.type == CollisionType.TRIANGLE_LIST:
-                    vertices, faces = [], []
-                    vertex_idx = 0
+                    # location, location + edge a, location + edge b for every triangle
+                    triangles = primitive.triangles[:, :, (0, 2, 1)].astype(np.float64)
+                    vertices = triangles.copy()
+                    vertices[:, 1:] += triangles[:, :1]
 
-                    for triangle in primitive.triangles:
-                        v1 = (triangle.location.x, triangle.location.z, triangle.location.y)
-                        v2 = (v1[0] + triangle.edge_a.x, v1[1] + triangle.edge_a.z, v1[2] + triangle.edge_a.y)
-                        v3 = (v1[0] + triangle.edge_b.x, v1[1] + triangle.edge_b.z, v1[2] + triangle.edge_b.y)
-                        vertices.extend((v1, v2, v3))
-                        faces.append((vertex_idx, vertex_idx + 2, vertex_idx + 1))
-                        vertex_idx += 3
+                    faces = np.arange(len(vertices) * 3).reshape(-1, 3)[:, (0, 2, 1)]
 
                     col_data = bpy.data.meshes.new(col_name)
-                    col_data.from_pydata(vertices, [], faces)
+                    col_data.from_pydata(vertices.reshape(-1, 3).tolist(), [], faces.tolist())
 
                     col_obj = bpy.data.objects.new(col_name, col_data)
 
@@ -100,6 +100,7 @@ class SknExporter:
 
     def __init__(self):
         self.skn = SKN()
+        self.report = []
 
 
 def save(context, filepath, options):
@@ -112,6 +113,11 @@ def save(context, filepath, options):
         "version": options["msh_version"],
         "armature_object": arm_obj,
         "apply_root_transform": options["apply_root_transform"],
+        "optimize_vertex_cache": options["optimize_vertex_cache"],
+        "optimize_vertex_fetch": options["optimize_vertex_fetch"],
+        "verify_strips": options["verify_strips"],
+        "strip_workers": options["strip_workers"],
+        "mesh_workers": options["mesh_workers"],
     }
 
     msh_exporter = MshExporter()
@@ -147,8 +153,9 @@ def save(context, filepath, options):
     skn_exporter = SknExporter()
     skn_exporter.skn.name = msh_name
     skn_exporter.export_data(context, skn_options)
+    skn_exporter.report.extend(msh_exporter.report)
 
     skn_exporter.skn.save_file(filepath)
-    msh_exporter.msh.save_file(os.path.join(directory, msh_name))
+    msh_exporter.msh.save_file(os.path.join(directory, msh_name), options["strip_workers"], options["mesh_workers"])
 
     return skn_exporter
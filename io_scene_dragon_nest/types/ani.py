@@ -1,78 +1,149 @@
+import numpy as np
+
+from collections.abc import Sequence
+from contextlib import ExitStack
 from dataclasses import dataclass
-from typing import List, Union
+from functools import partial
+from typing import List, Optional, Union
 
 from .common import *
-from .reader import Reader
+from .reader import LazyRecords, Reader, map_file
+from .schema import INT, Schema, padding, string
+from .writer import stream_sections, write_sections
+
+
+ANI_HEADER = Schema(
+    string(256),  # file type
+    INT,          # version
+    INT,          # bones
+    INT,          # animations
+    size=1024,
+)
+
+BONE_HEADER = Schema(string(256), string(256), padding(512))
+
+ANIMATION_BASE = Schema(VECTOR3D, VECTOR4D, VECTOR3D)
 
 
 @dataclass
 class KeyFrame:
+    __slots__ = ("frame", "value")
+
     frame: int
     value: Union[Vector3D, Vector4D]
 
 
+class KeyTrack(Sequence):
+    """Keyframes of one channel stored as columns, frames as an integer array and values as a
+    (N, 3) or (N, 4) float32 array. Indexing still returns KeyFrame objects."""
+
+    # key_dtype is the on-disk layout of one key, a frame followed by the value components
+    @staticmethod
+    def key_dtype(width: int, short_frames: bool, short_values: bool) -> np.dtype:
+        return np.dtype([
+            ("frame", "<i2" if short_frames else "<i4"),
+            ("value", "<i2" if short_values else "<f4", (width,)),
+        ])
+
+    @classmethod
+    def read(cls, reader: Reader, width: int, short_frames: bool, short_values=False):
+        keys = reader.read_array(cls.key_dtype(width, short_frames, short_values), reader.read_int())
+        values = keys["value"]
+        if short_values:
+            values = decode_short_quats(values)
+        return cls(keys["frame"], values)
+
+    @classmethod
+    def skip(cls, reader: Reader, width: int, short_frames: bool, short_values=False):
+        reader.skip(reader.read_int() * cls.key_dtype(width, short_frames, short_values).itemsize)
+
+    @classmethod
+    def from_keyframes(cls, keyframes: List[KeyFrame], width: int):
+        frames = np.array([kf.frame for kf in keyframes], dtype=np.int32)
+        values = np.array([kf.value.unpack() for kf in keyframes], dtype=np.float32).reshape(-1, width)
+        return cls(frames, values)
+
+    def calc_size(self, short_frames: bool, short_values=False) -> int:
+        return 4 + len(self) * self.key_dtype(self.values.shape[1], short_frames, short_values).itemsize
+
+    # NOTE: frames are checked before the cast, numpy would wrap frames past the short range silently
+    def write(self, writer: Writer, short_frames: bool, short_values=False):
+        keys = np.empty(len(self), self.key_dtype(self.values.shape[1], short_frames, short_values))
+
+        limits = np.iinfo(keys.dtype["frame"])
+        if len(self) > 0 and (self.frames.min() < limits.min or self.frames.max() > limits.max):
+            raise ValueError(f"Key frames {self.frames.min()}..{self.frames.max()} "
+                             f"do not fit in {limits.min}..{limits.max}")
+
+        keys["frame"] = self.frames
+        if short_values:
+            keys["value"] = encode_short_quats(self.values)
+        else:
+            keys["value"] = self.values
+
+        writer.write_int(len(self))
+        writer.write_array(keys, keys.dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        value = self.values[index].tolist()
+        return KeyFrame(int(self.frames[index]), Vector3D(*value) if len(value) == 3 else Vector4D(*value))
+
+    def __init__(self, frames, values):
+        self.frames = np.asarray(frames)
+        self.values = np.asarray(values, dtype=np.float32)
+
+
 @dataclass
 class Animation:
     base_location: Vector3D
     base_rotation: Vector4D
     base_scale: Vector3D
 
-    locations: List[KeyFrame]
-    rotations: List[KeyFrame]
-    scales: List[KeyFrame]
+    locations: KeyTrack
+    rotations: KeyTrack
+    scales: KeyTrack
 
+    # NOTE: version 10 files store int frames and float rotations, version 11 and .anim files store shorts for both
     @classmethod
-    def read(cls, reader: Reader, read_frame_func, read_rotation_func):
-        base_location = Vector3D.read(reader)
-        base_rotation = Vector4D.read(reader)
-        base_scale = Vector3D.read(reader)
-        locations, rotations, scales = [], [], []
-
-        # locations
-        frames_num = reader.read_int()
-        for _ in range(frames_num):
-            frame, value = read_frame_func(), Vector3D.read(reader)
-            locations.append(KeyFrame(frame, value))
-
-        # rotations
-        frames_num = reader.read_int()
-        for _ in range(frames_num):
-            frame, value = read_frame_func(), read_rotation_func(reader)
-            rotations.append(KeyFrame(frame, value))
-
-        # scales
-        frames_num = reader.read_int()
-        for _ in range(frames_num):
-            frame, value = read_frame_func(), Vector3D.read(reader)
-            scales.append(KeyFrame(frame, value))
+    def read(cls, reader: Reader, short_keys: bool):
+        base_location, base_rotation, base_scale = ANIMATION_BASE.read(reader)
+
+        locations = KeyTrack.read(reader, 3, short_keys)
+        rotations = KeyTrack.read(reader, 4, short_keys, short_keys)
+        scales = KeyTrack.read(reader, 3, short_keys)
 
         return cls(
             base_location, base_rotation, base_scale,
             locations, rotations, scales,
         )
 
-    def write(self, writer: Writer, write_frame_func, write_rotation_func):
-        self.base_location.write(writer)
-        self.base_rotation.write(writer)
-        self.base_scale.write(writer)
+    @classmethod
+    def skip(cls, reader: Reader, short_keys: bool):
+        reader.skip(ANIMATION_BASE.size)
 
-        # locations
-        writer.write_int(len(self.locations))
-        for kf in self.locations:
-            write_frame_func(kf.frame)
-            kf.value.write(writer)
+        KeyTrack.skip(reader, 3, short_keys)
+        KeyTrack.skip(reader, 4, short_keys, short_keys)
+        KeyTrack.skip(reader, 3, short_keys)
 
-        # rotations
-        writer.write_int(len(self.rotations))
-        for kf in self.rotations:
-            write_frame_func(kf.frame)
-            write_rotation_func(kf.value, writer)
+    def calc_size(self, short_keys: bool) -> int:
+        size = ANIMATION_BASE.size
+        size += self.locations.calc_size(short_keys)
+        size += self.rotations.calc_size(short_keys, short_keys)
+        size += self.scales.calc_size(short_keys)
+        return size
 
-        # scales
-        writer.write_int(len(self.scales))
-        for kf in self.scales:
-            write_frame_func(kf.frame)
-            kf.value.write(writer)
+    def write(self, writer: Writer, short_keys: bool):
+        ANIMATION_BASE.write(writer, (self.base_location, self.base_rotation, self.base_scale))
+
+        self.locations.write(writer, short_keys)
+        self.rotations.write(writer, short_keys, short_keys)
+        self.scales.write(writer, short_keys)
 
 
 @dataclass
@@ -85,19 +156,17 @@ class AnimationBone:
 class ANIM:
 
     def load_memory(self, data: bytes):
-        reader = Reader(data)
-
-        while reader.buffered() > 0:
-            bone_name = reader.read_string()
-            bone_parent_name = reader.read_string()
-            bone_anims = [Animation.read(reader, reader.read_short, Vector4D.read_short)]
+        with Reader(data) as reader:
+            while reader.buffered() > 0:
+                bone_name = reader.read_string()
+                bone_parent_name = reader.read_string()
+                bone_anims = [Animation.read(reader, True)]
 
-            bone = AnimationBone(bone_name, bone_parent_name, bone_anims)
-            self.bones.append(bone)
+                bone = AnimationBone(bone_name, bone_parent_name, bone_anims)
+                self.bones.append(bone)
 
     def load_file(self, filename: str):
-        with open(filename, mode="rb") as file:
-            data = file.read()
+        with map_file(filename) as data:
             self.load_memory(data)
 
     def clear(self):
@@ -107,89 +176,104 @@ class ANIM:
         self.clear()
 
 
-class ANI:
+@dataclass
+class ANIInfo:
+    file_type: str
+    version: int
+    bones_num: int
+    names: List[str]
+    frames_num: List[int]
 
-    def load_memory(self, data: bytes):
-        reader = Reader(data)
 
-        self.file_type = reader.read_string(256)
-        if not self.file_type.startswith("Eternity Engine Ani File"):
-            return
+# probe reads only the file header and the animation name table, None is returned for files that are not animations
+def probe(filename: str) -> Optional[ANIInfo]:
+    with open(filename, mode="rb") as file:
+        header = file.read(ANI_HEADER.size)
+        if len(header) < ANI_HEADER.size:
+            return None
 
-        self.version = reader.read_int()
-        bones_num, anims_num = reader.read_int(2)
+        with Reader(header) as reader:
+            file_type, version, bones_num, anims_num = ANI_HEADER.read(reader)
 
-        reader._pos = 1024
+        if not file_type.startswith("Eternity Engine Ani File"):
+            return None
 
-        self.names = [reader.read_string(256) for _ in range(anims_num)]
-        self.frames_num = [reader.read_int() for _ in range(anims_num)]
+        table = file.read(anims_num * (256 + 4))
 
-        if self.version < 11:
-            read_frame_func = reader.read_int
-            read_rotation_func = Vector4D.read
-        else:
-            read_frame_func = reader.read_short
-            read_rotation_func = Vector4D.read_short
+    with Reader(table) as reader:
+        names = [reader.read_string(256) for _ in range(anims_num)]
+        frames_num = [reader.read_int() for _ in range(anims_num)]
+
+    return ANIInfo(file_type, version, bones_num, names, frames_num)
 
-        self.bones = []
-        for _ in range(bones_num):
-            bone_name = reader.read_string(256)
-            bone_parent_name = reader.read_string(256)
 
-            reader.read_bytes(512)
+class ANI:
+
+    def load_memory(self, data: bytes):
+        with Reader(data) as reader:
+            if reader.buffered() < ANI_HEADER.size:
+                return
 
-            bone_anims = []
-            for _ in range(anims_num):
-                anim = Animation.read(reader, read_frame_func, read_rotation_func)
-                bone_anims.append(anim)
+            header = ANI_HEADER.read(reader)
+            if not header[0].startswith("Eternity Engine Ani File"):
+                return
 
-            bone = AnimationBone(bone_name, bone_parent_name, bone_anims)
-            self.bones.append(bone)
+            self.file_type, self.version, bones_num, anims_num = header
 
-    def save_memory(self) -> bytes:
-        writer = Writer()
+            self.names = [reader.read_string(256) for _ in range(anims_num)]
+            self.frames_num = [reader.read_int() for _ in range(anims_num)]
 
-        writer.write_string(self.file_type, 256)
-        writer.write_int(self.version)
+            short_keys = self.version >= 11
 
-        bones_num = len(self.bones)
-        anims_num = len(self.names)
+            self.bones = []
+            for _ in range(bones_num):
+                bone_name, bone_parent_name = BONE_HEADER.read(reader)
 
-        writer.write_int((bones_num, anims_num))
-        writer.write_bytes(b'\0' * (1024 - len(writer.data)))
+                bone_anims = []
+                for _ in range(anims_num):
+                    anim = Animation.read(reader, short_keys)
+                    bone_anims.append(anim)
+
+                bone = AnimationBone(bone_name, bone_parent_name, bone_anims)
+                self.bones.append(bone)
+
+    def _write_header(self, writer: Writer):
+        ANI_HEADER.write(writer, (self.file_type, self.version, len(self.bones), len(self.names)))
 
         for name in self.names:
             writer.write_string(name, 256)
 
         writer.write_int(self.frames_num)
 
-        if self.version < 11:
-            write_frame_func = writer.write_int
-            write_rotation_func = Vector4D.write
-        else:
-            write_frame_func = writer.write_short
-            write_rotation_func = Vector4D.write_short
+    def _write_bone(self, bone: AnimationBone, writer: Writer):
+        BONE_HEADER.write(writer, (bone.name, bone.parent_name))
 
-        for bone in self.bones:
-            writer.write_string(bone.name, 256)
-            writer.write_string(bone.parent_name, 256)
+        for anim in bone.animations:
+            anim.write(writer, self.version >= 11)
 
-            writer.write_bytes(b'\0' * 512)
+    # sections yields the file in (size, write_func) parts, one for the header and one per bone
+    def sections(self):
+        short_keys = self.version >= 11
 
-            for anim in bone.animations:
-                anim.write(writer, write_frame_func, write_rotation_func)
+        header_size = ANI_HEADER.size + 4 * len(self.frames_num)
+        header_size += sum(Writer.string_size(name, 256) for name in self.names)
+        yield header_size, self._write_header
 
-        return writer.data
+        for bone in self.bones:
+            size = BONE_HEADER.size
+            size += sum(anim.calc_size(short_keys) for anim in bone.animations)
+            yield size, partial(self._write_bone, bone)
+
+    def save_memory(self) -> bytes:
+        return write_sections(self.sections())
 
     def load_file(self, filename: str):
-        with open(filename, mode="rb") as file:
-            data = file.read()
+        with map_file(filename) as data:
             self.load_memory(data)
 
     def save_file(self, filename: str):
         with open(filename, mode="wb") as file:
-            data = self.save_memory()
-            file.write(data)
+            stream_sections(file, self.sections())
 
     def clear(self):
         self.file_type = ""
@@ -200,3 +284,55 @@ class ANI:
 
     def __init__(self):
         self.clear()
+
+
+class LazyANI(ANI):
+    """ANI that only indexes the animation offsets of every bone when loaded, an animation is read
+    the first time it is accessed. The file stays mapped until close() is called."""
+
+    def load_memory(self, data: bytes):
+        with Reader(data) as reader:
+            if reader.buffered() < ANI_HEADER.size:
+                return
+
+            header = ANI_HEADER.read(reader)
+            if not header[0].startswith("Eternity Engine Ani File"):
+                return
+
+            self.file_type, self.version, bones_num, anims_num = header
+
+            self.names = [reader.read_string(256) for _ in range(anims_num)]
+            self.frames_num = [reader.read_int() for _ in range(anims_num)]
+
+            short_keys = self.version >= 11
+
+            self.bones = []
+            for _ in range(bones_num):
+                bone_name, bone_parent_name = BONE_HEADER.read(reader)
+
+                offsets = []
+                for _ in range(anims_num):
+                    offsets.append(reader.tell())
+                    Animation.skip(reader, short_keys)
+
+                bone_anims = LazyRecords(data, offsets, partial(Animation.read, short_keys=short_keys))
+
+                bone = AnimationBone(bone_name, bone_parent_name, bone_anims)
+                self.bones.append(bone)
+
+    def load_file(self, filename: str):
+        self.close()
+        self.load_memory(self._files.enter_context(map_file(filename)))
+
+    def close(self):
+        self._files.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __init__(self):
+        self._files = ExitStack()
+        super().__init__()
@@ -1,11 +1,16 @@
+import numpy as np
+
 from dataclasses import dataclass
 
 from .reader import Reader
+from .schema import Field
 from .writer import Writer
 
 
 @dataclass
 class Vector3D:
+    __slots__ = ("x", "y", "z")
+
     x: float
     y: float
     z: float
@@ -17,12 +22,29 @@ class Vector3D:
     def unpack(self) -> tuple:
         return (self.x, self.y, self.z)
 
+    def calc_size(self) -> int:
+        return 12
+
     def write(self, writer: Writer):
         writer.write_float(self.unpack())
 
 
+# Short quaternions store each component as an int16, decoded with a 2^-15 scale and encoded as
+# round(v * 0x7fff) in float64 with halves rounded to even, saturating at the int16 range.
+
+def decode_short_quats(values: np.ndarray) -> np.ndarray:
+    return values.astype(np.float32) * np.float32(2 ** -15)
+
+
+def encode_short_quats(values: np.ndarray) -> np.ndarray:
+    values = np.rint(np.asarray(values, dtype=np.float64) * 0x7fff)
+    return np.clip(values, -0x8000, 0x7fff).astype(np.int16)
+
+
 @dataclass
 class Vector4D:
+    __slots__ = ("x", "y", "z", "w")
+
     x: float
     y: float
     z: float
@@ -40,6 +62,9 @@ class Vector4D:
     def unpack(self) -> tuple:
         return (self.x, self.y, self.z, self.w)
 
+    def calc_size(self) -> int:
+        return 16
+
     def write(self, writer: Writer):
         writer.write_float(self.unpack())
 
@@ -50,6 +75,8 @@ class Vector4D:
 
 @dataclass
 class Matrix3x3:
+    __slots__ = ("v1", "v2", "v3")
+
     v1: Vector3D
     v2: Vector3D
     v3: Vector3D
@@ -62,6 +89,10 @@ class Matrix3x3:
             Vector3D.read(reader),
         )
 
+    @classmethod
+    def from_floats(cls, *values):
+        return cls(*(Vector3D(*values[i:i+3]) for i in range(0, 9, 3)))
+
     @classmethod
     def identity(cls):
         return cls(
@@ -77,6 +108,12 @@ class Matrix3x3:
             self.v3.unpack(),
         )
 
+    def flatten(self) -> tuple:
+        return self.v1.unpack() + self.v2.unpack() + self.v3.unpack()
+
+    def calc_size(self) -> int:
+        return 36
+
     def write(self, writer: Writer):
         self.v1.write(writer)
         self.v2.write(writer)
@@ -85,6 +122,8 @@ class Matrix3x3:
 
 @dataclass
 class Matrix4x4:
+    __slots__ = ("v1", "v2", "v3", "v4")
+
     v1: Vector4D
     v2: Vector4D
     v3: Vector4D
@@ -99,6 +138,10 @@ class Matrix4x4:
             Vector4D.read(reader),
         )
 
+    @classmethod
+    def from_floats(cls, *values):
+        return cls(*(Vector4D(*values[i:i+4]) for i in range(0, 16, 4)))
+
     @classmethod
     def identity(cls):
         return cls(
@@ -116,8 +159,20 @@ class Matrix4x4:
             self.v4.unpack(),
         )
 
+    def flatten(self) -> tuple:
+        return self.v1.unpack() + self.v2.unpack() + self.v3.unpack() + self.v4.unpack()
+
+    def calc_size(self) -> int:
+        return 64
+
     def write(self, writer: Writer):
         self.v1.write(writer)
         self.v2.write(writer)
         self.v3.write(writer)
         self.v4.write(writer)
+
+
+VECTOR3D = Field('3f', Vector3D, Vector3D.unpack)
+VECTOR4D = Field('4f', Vector4D, Vector4D.unpack)
+MATRIX3X3 = Field('9f', Matrix3x3.from_floats, Matrix3x3.flatten)
+MATRIX4X4 = Field('16f', Matrix4x4.from_floats, Matrix4x4.flatten)
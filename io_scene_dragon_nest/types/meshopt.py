@@ -0,0 +1,109 @@
+import numpy as np
+
+from collections import deque
+
+
+# acmr is the average cache miss ratio, vertices transformed per triangle with a FIFO post-transform cache
+def acmr(faces, cache_size=16) -> float:
+    faces = np.asarray(faces).reshape(-1, 3)
+    if len(faces) == 0:
+        return 0.0
+
+    cache = deque()
+    cached = set()
+    misses = 0
+    for vertex in faces.ravel().tolist():
+        if vertex not in cached:
+            misses += 1
+            cache.append(vertex)
+            cached.add(vertex)
+            if len(cache) > cache_size:
+                cached.discard(cache.popleft())
+
+    return misses / len(faces)
+
+
+# vertex_triangles returns for every vertex the triangles using it, as triangles[offsets[v]:offsets[v + 1]]
+def vertex_triangles(faces, vertices_num: int):
+    counts = np.bincount(faces.ravel(), minlength=vertices_num)
+    offsets = np.zeros(vertices_num + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    triangles = np.argsort(faces.ravel(), kind='stable') // 3
+    return offsets, triangles, counts
+
+
+# tipsify reorders faces for the post-transform vertex cache, following Sander, Nehab and Barczak 2007
+# "Fast Triangle Reordering for Vertex Locality and Reduced Overdraw", the winding of every face is kept
+def tipsify(faces, vertices_num=None, cache_size=16) -> np.ndarray:
+    faces = np.asarray(faces).reshape(-1, 3)
+    if len(faces) == 0:
+        return faces.copy()
+
+    if vertices_num is None:
+        vertices_num = int(faces.max()) + 1
+
+    offsets, triangles, live = vertex_triangles(faces, vertices_num)
+    offsets = offsets.tolist()
+    triangles = triangles.tolist()
+    live = live.tolist()
+    face_list = faces.tolist()
+
+    cache_time = [0] * vertices_num
+    timestamp = cache_size + 1
+    emitted = [False] * len(face_list)
+    dead_end = []
+    order = []
+
+    fanning = 0
+    cursor = 0
+    while fanning >= 0:
+        candidates = []
+        for triangle in triangles[offsets[fanning]:offsets[fanning + 1]]:
+            if emitted[triangle]:
+                continue
+
+            emitted[triangle] = True
+            order.append(triangle)
+            for vertex in face_list[triangle]:
+                dead_end.append(vertex)
+                candidates.append(vertex)
+                live[vertex] -= 1
+                if timestamp - cache_time[vertex] > cache_size:
+                    cache_time[vertex] = timestamp
+                    timestamp += 1
+
+        # prefer the candidate that stays in the cache longest while its triangles are emitted
+        fanning = -1
+        best_priority = -1
+        for vertex in candidates:
+            if live[vertex] > 0:
+                priority = 0
+                if timestamp - cache_time[vertex] + 2 * live[vertex] <= cache_size:
+                    priority = timestamp - cache_time[vertex]
+                if priority > best_priority:
+                    fanning = vertex
+                    best_priority = priority
+
+        if fanning < 0:
+            while dead_end:
+                vertex = dead_end.pop()
+                if live[vertex] > 0:
+                    fanning = vertex
+                    break
+
+        if fanning < 0:
+            while cursor < vertices_num:
+                if live[cursor] > 0:
+                    fanning = cursor
+                    break
+                cursor += 1
+
+    return faces[np.array(order, dtype=np.int64)]
+
+
+# fetch_order lists the vertices in order of first use by the index stream, unused vertices go last
+def fetch_order(indices, vertices_num: int) -> np.ndarray:
+    indices = np.asarray(indices).ravel()
+    used, first_use = np.unique(indices, return_index=True)
+    unused = np.setdiff1d(np.arange(vertices_num), used)
+    return np.concatenate([used[np.argsort(first_use)], unused]).astype(np.int64)
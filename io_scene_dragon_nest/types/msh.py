@@ -1,11 +1,18 @@
+import numpy as np
+
+from collections.abc import Iterable, Sequence
+from contextlib import ExitStack
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import List, Union
+from functools import partial
+from typing import List, Optional, Tuple, Union
 
+from . import stripcache
 from .common import *
 from .pyffi.utils import tristrip
-from .reader import Reader
-from .writer import Writer
+from .reader import LazyRecords, Reader, decode_string, map_file
+from .schema import FLOAT, INT, Field, Schema, padding, string
+from .writer import Writer, stream_sections, write_sections
 
 
 class CollisionType(IntEnum):
@@ -15,25 +22,65 @@ class CollisionType(IntEnum):
     TRIANGLE_LIST = 3
 
 
+MSH_HEADER = Schema(
+    string(256),  # file type
+    INT,          # version
+    INT,          # meshes
+    INT,          # lods
+    INT,          # uv animation
+    VECTOR3D,     # bounding box max
+    VECTOR3D,     # bounding box min
+    INT,          # bones
+    INT,          # collisions
+    INT,          # dummies
+    size=1024,
+)
+
+BONE_RECORD = Schema(string(256), MATRIX4X4)
+
+DUMMY_RECORD = Schema(string(256), string(256), MATRIX4X4)
+DUMMY_RECORD_V12 = Schema(string(256), VECTOR3D)
+DUMMY_PARENT_V12 = Schema(string(256))
+
+MESH_HEADER = Schema(
+    string(256),  # parent name
+    string(256),  # name
+    Field('3l'),  # vertices, indices, uvs
+    Field('4B'),  # tristrip, rig, vertex colors flags
+    padding(512 - 16),
+)
+
+PRIMITIVE_BOX = Schema(VECTOR3D, MATRIX3X3, VECTOR3D)
+PRIMITIVE_SPHERE = Schema(VECTOR3D, FLOAT)
+PRIMITIVE_CAPSULE = Schema(VECTOR3D, VECTOR3D, FLOAT)
+
+
 @dataclass
 class Bone:
+    __slots__ = ("name", "matrix")
+
     name: str
     matrix: Matrix4x4
 
     @classmethod
     def read(cls, reader: Reader):
-        return cls(
-            reader.read_string(256),
-            Matrix4x4.read(reader),
-        )
+        return cls(*BONE_RECORD.read(reader))
+
+    @classmethod
+    def skip(cls, reader: Reader):
+        reader.skip(BONE_RECORD.size)
+
+    def calc_size(self) -> int:
+        return BONE_RECORD.size
 
     def write(self, writer: Writer):
-        writer.write_string(self.name, 256)
-        self.matrix.write(writer)
+        BONE_RECORD.write(writer, (self.name, self.matrix))
 
 
 @dataclass
 class Dummy:
+    __slots__ = ("name", "parent_name", "transformation")
+
     name: str
     parent_name: str
     transformation: Union[Matrix4x4, Vector3D]
@@ -41,18 +88,15 @@ class Dummy:
     @classmethod
     def read(cls, reader: Reader, version: int):
         if version > 12:
-            name = reader.read_string(256)
-            parent_name = reader.read_string(256)
-            transformation = Matrix4x4.read(reader)
+            name, parent_name, transformation = DUMMY_RECORD.read(reader)
 
         else:
-            name = reader.read_string(256)
+            name, transformation = DUMMY_RECORD_V12.read(reader)
             parent_name = ""
-            transformation = Vector3D.read(reader)
 
             if name[0] == "L":
                 name = name[1:]
-                parent_name = reader.read_string(256)
+                parent_name, = DUMMY_PARENT_V12.read(reader)
 
         return cls(
             name,
@@ -60,122 +104,348 @@ class Dummy:
             transformation,
         )
 
+    @classmethod
+    def skip(cls, reader: Reader, version: int):
+        if version > 12:
+            reader.skip(DUMMY_RECORD.size)
+
+        else:
+            name, _ = DUMMY_RECORD_V12.read(reader)
+
+            if name[0] == "L":
+                reader.skip(DUMMY_PARENT_V12.size)
+
+    def calc_size(self, version: int) -> int:
+        if version > 12:
+            return DUMMY_RECORD.size
+        elif self.parent_name:
+            return DUMMY_RECORD_V12.size + DUMMY_PARENT_V12.size
+        else:
+            return DUMMY_RECORD_V12.size
+
     def write(self, writer: Writer, version: int):
         if version > 12:
-            writer.write_string(self.name, 256)
-            writer.write_string(self.parent_name, 256)
-            self.transformation.write(writer)
+            DUMMY_RECORD.write(writer, (self.name, self.parent_name, self.transformation))
 
         else:
             if self.parent_name:
-                writer.write_string("L" + self.name, 256)
-                self.transformation.write(writer)
-                writer.write_string(self.parent_name, 256)
+                DUMMY_RECORD_V12.write(writer, ("L" + self.name, self.transformation))
+                DUMMY_PARENT_V12.write(writer, (self.parent_name,))
             else:
-                writer.write_string(self.name, 256)
-                self.transformation.write(writer)
+                DUMMY_RECORD_V12.write(writer, (self.name, self.transformation))
+
+
+def decode_names(names: np.ndarray) -> List[str]:
+    return [decode_string(name) for name in names.tolist()]
+
+
+def encode_names(names: List[str]) -> List[bytes]:
+    return [name.encode('cp949') for name in names]
+
+
+class BoneTable(Sequence):
+    """Bones stored as a list of names and an (N, 4, 4) float32 matrix array, read and written
+    as one block. Indexing returns Bone objects."""
+
+    dtype = np.dtype([("name", "S256"), ("matrix", "<f4", (4, 4))])
+
+    @classmethod
+    def read(cls, reader: Reader, num: int):
+        records = reader.read_array(cls.dtype, num)
+        return cls(decode_names(records["name"]), records["matrix"])
+
+    @classmethod
+    def from_bones(cls, bones: Iterable[Bone]):
+        bones = list(bones)
+        matrices = np.array([bone.matrix.unpack() for bone in bones], dtype=np.float32).reshape(-1, 4, 4)
+        return cls([bone.name for bone in bones], matrices)
+
+    def calc_size(self) -> int:
+        return len(self) * self.dtype.itemsize
+
+    def write(self, writer: Writer):
+        records = np.zeros(len(self), self.dtype)
+        records["name"] = encode_names(self.names)
+        records["matrix"] = self.matrices
+        writer.write_array(records, self.dtype)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Bone(self.names[index], Matrix4x4.from_floats(*self.matrices[index].ravel().tolist()))
+
+    def __init__(self, names: List[str], matrices: np.ndarray):
+        self.names = names
+        self.matrices = matrices
+
+
+class DummyTable(Sequence):
+    """Dummies stored as name lists and a transformation array, (N, 4, 4) float32 matrices for
+    version 13 and (N, 3) float32 locations before it. Indexing returns Dummy objects."""
+
+    dtype = np.dtype([("name", "S256"), ("parent_name", "S256"), ("matrix", "<f4", (4, 4))])
+
+    @classmethod
+    def read(cls, reader: Reader, num: int, version: int):
+        if version > 12:
+            records = reader.read_array(cls.dtype, num)
+            return cls(decode_names(records["name"]), decode_names(records["parent_name"]), records["matrix"])
+
+        # NOTE: older dummies only carry a parent name when linked, so they are read one by one
+        return cls.from_dummies([Dummy.read(reader, version) for _ in range(num)])
+
+    @classmethod
+    def from_dummies(cls, dummies: Iterable[Dummy]):
+        dummies = list(dummies)
+        transformations = np.array([dummy.transformation.unpack() for dummy in dummies], dtype=np.float32)
+        if len(dummies) == 0:
+            transformations = transformations.reshape(0, 3)
+        return cls(
+            [dummy.name for dummy in dummies],
+            [dummy.parent_name for dummy in dummies],
+            transformations,
+        )
+
+    def calc_size(self, version: int) -> int:
+        if version > 12:
+            return len(self) * self.dtype.itemsize
+        return sum(dummy.calc_size(version) for dummy in self)
+
+    def write(self, writer: Writer, version: int):
+        if version > 12:
+            records = np.zeros(len(self), self.dtype)
+            records["name"] = encode_names(self.names)
+            records["parent_name"] = encode_names(self.parent_names)
+            records["matrix"] = self.transformations.reshape(-1, 4, 4)
+            writer.write_array(records, self.dtype)
+
+        else:
+            for dummy in self:
+                dummy.write(writer, version)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        values = self.transformations[index].ravel().tolist()
+        if len(values) == 16:
+            transformation = Matrix4x4.from_floats(*values)
+        else:
+            transformation = Vector3D(*values)
+
+        return Dummy(self.names[index], self.parent_names[index], transformation)
+
+    def __init__(self, names: List[str], parent_names: List[str], transformations: np.ndarray):
+        self.names = names
+        self.parent_names = parent_names
+        self.transformations = transformations
+
+
+class MeshStream:
+    """Mesh attribute stored as a contiguous numpy array of a fixed dtype and row width.
+    Assigned sequences (e.g. lists of tuples) are converted, and rows index like the old lists.
+    Reading always gives the array, so use len() for emptiness and assign instead of appending."""
+
+    def __init__(self, dtype, width=None, layers=False):
+        self.dtype = dtype
+        self.width = width
+        self.layers = layers
+
+    def __set_name__(self, owner, name):
+        self.name = "_" + name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+
+        return getattr(obj, self.name)
+
+    def __set__(self, obj, value):
+        if self.layers:
+            value = [self.to_array(layer) for layer in value]
+        else:
+            value = self.to_array(value)
+        setattr(obj, self.name, value)
+
+    def to_array(self, value) -> np.ndarray:
+        value = np.ascontiguousarray(value, dtype=self.dtype)
+        if self.width:
+            value = value.reshape(-1, self.width)
+        return value
 
 
 class Mesh:
 
+    faces = MeshStream(np.uint16, 3)
+    vertices = MeshStream(np.float32, 3)
+    normals = MeshStream(np.float32, 3)
+    uvs = MeshStream(np.float32, 2, layers=True)
+    vertex_colors = MeshStream(np.float32)
+    rig_indices = MeshStream(np.int16, 4)
+    rig_weights = MeshStream(np.float32, 4)
+
     @classmethod
     def read(cls, reader: Reader):
         self = cls()
 
         # header
-        self.parent_name = reader.read_string(256)
-        self.name = reader.read_string(256)
-
-        verts_num, indices_num, uvs_num = reader.read_int(3)
-        self.use_tristrip, use_rig, use_vert_color, _ = reader.read_bytes(4)
+        self.parent_name, self.name, counts, flags = MESH_HEADER.read(reader)
 
-        reader.read_bytes(512 - 16)
+        verts_num, indices_num, uvs_num = counts
+        self.use_tristrip, use_rig, use_vert_color, _ = flags
 
         # faces
         if self.use_tristrip:
-            v1, v2 = reader.read_ushort(2)
-            direct = -1
-            for _ in range(indices_num - 2):
-                v3 = reader.read_ushort()
-                direct *= -1
-                if v1 != v2 and v2 != v3 and v1 != v3:
-                    self.faces.append([v1, v2, v3] if direct > 0 else [v1, v3, v2])
-                v1, v2 = v2, v3
+            self.faces = tristrip.triangulate_array(reader.read_array('<u2', indices_num))
         else:
-            self.faces = [reader.read_ushort(3) for _ in range(indices_num // 3)]
+            self.faces = reader.read_array('<u2', indices_num // 3 * 3)
 
         # vertices, normals, uvs
-        self.vertices = [reader.read_float(3) for _ in range(verts_num)]
-        self.normals = [reader.read_float(3) for _ in range(verts_num)]
-
-        self.uvs = []
-        for _ in range(uvs_num):
-            self.uvs.append([reader.read_float(2) for _ in range(verts_num)])
+        self.vertices = reader.read_array('<f4', verts_num * 3)
+        self.normals = reader.read_array('<f4', verts_num * 3)
+        self.uvs = [reader.read_array('<f4', verts_num * 2) for _ in range(uvs_num)]
 
         # vertex colors
         if use_vert_color:
-            self.vertex_colors = [reader.read_float() for _ in range(verts_num)]
+            self.vertex_colors = reader.read_array('<f4', verts_num)
 
         # rig
         if use_rig:
-            self.rig_indices = [reader.read_short(4) for _ in range(verts_num)]
-            self.rig_weights = [reader.read_float(4) for _ in range(verts_num)]
+            self.rig_indices = reader.read_array('<i2', verts_num * 4)
+            self.rig_weights = reader.read_array('<f4', verts_num * 4)
 
             bones_num = reader.read_int()
             self.rig_names = [reader.read_string(256) for _ in range(bones_num)]
 
         return self
 
-    def write(self, writer: Writer):
-        writer.write_string(self.parent_name, 256)
-        writer.write_string(self.name, 256)
+    @classmethod
+    def skip(cls, reader: Reader):
+        _, _, counts, flags = MESH_HEADER.read(reader)
+
+        verts_num, indices_num, uvs_num = counts
+        use_tristrip, use_rig, use_vert_color, _ = flags
+
+        if not use_tristrip:
+            indices_num = indices_num // 3 * 3
+
+        size = indices_num * 2
+        size += verts_num * (12 + 12 + 8 * uvs_num)
+
+        if use_vert_color:
+            size += verts_num * 4
+
+        reader.skip(size)
 
+        if use_rig:
+            reader.skip(verts_num * (8 + 16))
+            reader.skip(reader.read_int() * 256)
+
+    # encode_strip returns the faces as one stitched strip, strip_workers other than 1 stripifies spatial
+    # clusters of the faces in that many processes, None for all cores; strips are looked up in
+    # stripcache.default_cache first, so unchanged meshes are only stripified once
+    def encode_strip(self, strip_workers: Optional[int] = 1) -> np.ndarray:
+        return stripcache.default_cache.stripify(self.faces, True, self.vertices, strip_workers)[0]
+
+    # encode_indices returns the index stream to write, indices if they are set and else the faces
+    # encoded as a list or a strip
+    def encode_indices(self, strip_workers: Optional[int] = 1) -> np.ndarray:
+        if self.indices is not None:
+            return self.indices
+        if not self.use_tristrip:
+            return self.faces.ravel()
+        return self.encode_strip(strip_workers)
+
+    # choose_encoding sets use_tristrip to whichever encoding needs fewer indices, a list on a tie, keeps
+    # that encoding as the indices and returns the (strip, list) index counts; pass strip if it is made already
+    def choose_encoding(self, strip_workers: Optional[int] = 1, strip: Optional[np.ndarray] = None) -> Tuple[int, int]:
+        if strip is None:
+            strip = self.encode_strip(strip_workers)
+        list_num = self.faces.size
+
+        self.use_tristrip = len(strip) < list_num
+        self.indices = strip if self.use_tristrip else self.faces.ravel()
+        return len(strip), list_num
+
+    # reorder_vertices moves vertex order[i] to index i in every vertex stream and renumbers the faces
+    # and the indices, the returned array maps old vertex indices to new ones
+    def reorder_vertices(self, order) -> np.ndarray:
+        order = np.asarray(order)
+        remap = np.empty(len(order), dtype=np.int64)
+        remap[order] = np.arange(len(order))
+
+        self.vertices = self.vertices[order]
+        self.normals = self.normals[order]
+        self.uvs = [uv[order] for uv in self.uvs]
+
+        if len(self.vertex_colors) > 0:
+            self.vertex_colors = self.vertex_colors[order]
+
+        if len(self.rig_indices) > 0:
+            self.rig_indices = self.rig_indices[order]
+            self.rig_weights = self.rig_weights[order]
+
+        self.faces = remap[self.faces]
+        if self.indices is not None:
+            self.indices = remap[self.indices]
+        return remap
+
+    def calc_size(self, indices) -> int:
+        size = MESH_HEADER.size
+        size += len(indices) * 2
+        size += self.vertices.nbytes + self.normals.nbytes
+        size += sum(uv.nbytes for uv in self.uvs)
+        size += self.vertex_colors.nbytes
+
+        if len(self.rig_indices) > 0:
+            size += self.rig_indices.nbytes + self.rig_weights.nbytes + 4
+            size += sum(Writer.string_size(rig_name, 256) for rig_name in self.rig_names)
+
+        return size
+
+    def write(self, writer: Writer, indices=None):
         use_tristrip = self.use_tristrip
         use_rig = len(self.rig_indices) > 0
         use_vert_color = len(self.vertex_colors) > 0
 
-        if use_tristrip:
-            indices = tristrip.stripify(self.faces, True)[0]
-        else:
-            indices = []
-            for f in self.faces:
-                indices += f
+        if indices is None:
+            indices = self.encode_indices()
 
         verts_num = len(self.vertices)
         indices_num = len(indices)
         uvs_num = len(self.uvs)
 
-        writer.write_int((verts_num, indices_num, uvs_num))
-        writer.write_int8((use_tristrip, use_rig, use_vert_color, 0))
-        writer.write_bytes(b'\0' * (512 - 16))
+        counts = (verts_num, indices_num, uvs_num)
+        flags = (use_tristrip, use_rig, use_vert_color, 0)
+        MESH_HEADER.write(writer, (self.parent_name, self.name, counts, flags))
 
         # faces
-        writer.write_ushort(indices)
+        writer.write_array(indices, '<u2')
 
         # vertices
-        for vec in self.vertices:
-            writer.write_float(vec)
+        writer.write_array(self.vertices, '<f4')
 
         # normals
-        for vec in self.normals:
-            writer.write_float(vec)
+        writer.write_array(self.normals, '<f4')
 
         # uvs
         for uv in self.uvs:
-            for vec in uv:
-                writer.write_float(vec)
+            writer.write_array(uv, '<f4')
 
         # vertex colors
         if use_vert_color:
-            writer.write_float(self.vertex_colors)
+            writer.write_array(self.vertex_colors, '<f4')
 
         # rig
         if use_rig:
-            for vec in self.rig_indices:
-                writer.write_short(vec)
-
-            for vec in self.rig_weights:
-                writer.write_float(vec)
+            writer.write_array(self.rig_indices, '<i2')
+            writer.write_array(self.rig_weights, '<f4')
 
             writer.write_int(len(self.rig_names))
             for rig_name in self.rig_names:
@@ -185,6 +455,8 @@ class Mesh:
         self.parent_name = ""
         self.name = ""
         self.use_tristrip = False
+        # index stream written by write, set it once the faces are final to write exactly these indices
+        self.indices: Optional[np.ndarray] = None
         self.faces = []
         self.vertices = []
         self.normals = []
@@ -195,97 +467,93 @@ class Mesh:
         self.rig_names = []
 
 
+# stripify_meshes returns the stitched strip of every mesh, mesh_workers other than 1 stripifies that many
+# meshes at once in worker processes, None for one per core; with one mesh worker strip_workers is used instead
+# NOTE: only the stripification runs in the workers, and each worker stripifies whole meshes without a cluster
+# pool of its own (strip_workers is forced to 1), so at most mesh_workers processes run
+def stripify_meshes(meshes: List[Mesh], mesh_workers: Optional[int] = 1, strip_workers: Optional[int] = 1) -> List[np.ndarray]:
+    if mesh_workers == 1:
+        return [mesh.encode_strip(strip_workers) for mesh in meshes]
+
+    strip_workers = 1
+    strips = stripcache.default_cache.stripify_all([mesh.faces for mesh in meshes], True, mesh_workers)
+    return [mesh_strips[0] for mesh_strips in strips]
+
+
 @dataclass
 class PrimitiveBox:
+    __slots__ = ("location", "axis", "extent")
+
     location: Vector3D
     axis: Matrix3x3
     extent: Vector3D
 
     @classmethod
     def read(cls, reader: Reader):
-        return cls(
-            Vector3D.read(reader),
-            Matrix3x3.read(reader),
-            Vector3D.read(reader),
-        )
+        return cls(*PRIMITIVE_BOX.read(reader))
+
+    def calc_size(self) -> int:
+        return PRIMITIVE_BOX.size
 
     def write(self, writer: Writer):
-        self.location.write(writer)
-        self.axis.write(writer)
-        self.extent.write(writer)
+        PRIMITIVE_BOX.write(writer, (self.location, self.axis, self.extent))
 
 
 @dataclass
 class PrimitiveSphere:
+    __slots__ = ("location", "radius")
+
     location: Vector3D
     radius: float
 
     @classmethod
     def read(cls, reader: Reader):
-        return cls(
-            Vector3D.read(reader),
-            reader.read_float(),
-        )
+        return cls(*PRIMITIVE_SPHERE.read(reader))
+
+    def calc_size(self) -> int:
+        return PRIMITIVE_SPHERE.size
 
     def write(self, writer: Writer):
-        self.location.write(writer)
-        writer.write_float(self.radius)
+        PRIMITIVE_SPHERE.write(writer, (self.location, self.radius))
 
 
 @dataclass
 class PrimitiveCapsule:
+    __slots__ = ("location", "direction", "radius")
+
     location: Vector3D
     direction: Vector3D
     radius: float
 
     @classmethod
     def read(cls, reader: Reader):
-        return cls(
-            Vector3D.read(reader),
-            Vector3D.read(reader),
-            reader.read_float(),
-        )
-
-    def write(self, writer: Writer):
-        self.location.write(writer)
-        self.direction.write(writer)
-        writer.write_float(self.radius)
+        return cls(*PRIMITIVE_CAPSULE.read(reader))
 
-
-@dataclass
-class PrimitiveTriangle:
-    location: Vector3D
-    edge_a: Vector3D
-    edge_b: Vector3D
-
-    @classmethod
-    def read(cls, reader: Reader):
-        return cls(
-            Vector3D.read(reader),
-            Vector3D.read(reader),
-            Vector3D.read(reader),
-        )
+    def calc_size(self) -> int:
+        return PRIMITIVE_CAPSULE.size
 
     def write(self, writer: Writer):
-        self.location.write(writer)
-        self.edge_a.write(writer)
-        self.edge_b.write(writer)
+        PRIMITIVE_CAPSULE.write(writer, (self.location, self.direction, self.radius))
 
 
-@dataclass
 class PrimitiveTriangleList:
-    triangles: List[PrimitiveTriangle]
+    """Triangles stored as an (N, 3, 3) float32 array, each one a location row followed by
+    the edge a and edge b rows."""
 
     @classmethod
     def read(cls, reader: Reader):
         triangles_num = reader.read_int()
-        triangles = [PrimitiveTriangle.read(reader) for _ in range(triangles_num)]
-        return cls(triangles)
+        return cls(reader.read_array('<f4', triangles_num * 9))
+
+    def calc_size(self) -> int:
+        return 4 + self.triangles.nbytes
 
     def write(self, writer: Writer):
         writer.write_int(len(self.triangles))
-        for triangle in self.triangles:
-            triangle.write(writer)
+        writer.write_array(self.triangles, '<f4')
+
+    def __init__(self, triangles):
+        self.triangles = np.asarray(triangles, dtype=np.float32).reshape(-1, 3, 3)
 
 
 class Collision:
@@ -312,6 +580,30 @@ class Collision:
 
         return self
 
+    @classmethod
+    def skip(cls, reader: Reader, version: int):
+        collision_type = reader.read_int()
+        if version > 10:
+            reader.skip(reader.read_int())
+
+        if collision_type == CollisionType.BOX:
+            reader.skip(12 + 36 + 12)
+
+        elif collision_type == CollisionType.SPHERE:
+            reader.skip(12 + 4)
+
+        elif collision_type == CollisionType.CAPSULE:
+            reader.skip(12 + 12 + 4)
+
+        elif collision_type == CollisionType.TRIANGLE_LIST:
+            reader.skip(reader.read_int() * 36)
+
+    def calc_size(self, version: int) -> int:
+        size = 4
+        if version > 10:
+            size += 4 + Writer.string_size(self.name)
+        return size + self.primitive.calc_size()
+
     def write(self, writer: Writer, version: int):
         writer.write_int(self.type)
         if version > 10:
@@ -325,69 +617,99 @@ class Collision:
         self.primitive = None
 
 
-class MSH:
-
-    def load_memory(self, data: bytes):
-        reader = Reader(data)
-
-        self.file_type = reader.read_string(256)
-        if not self.file_type.startswith("Eternity Engine Mesh File"):
-            return
-
-        self.version = reader.read_int()
-
-        meshes_num, lods_num = reader.read_int(2)
-        uv_ani = reader.read_bytes(4)[0]
-
-        self.bb_max = Vector3D.read(reader)
-        self.bb_min = Vector3D.read(reader)
+@dataclass
+class MSHInfo:
+    file_type: str
+    version: int
+    meshes_num: int
+    bones_num: int
+    collisions_num: int
+    dummies_num: int
+    bb_max: Vector3D
+    bb_min: Vector3D
 
-        bones_num, cols_num, dummies_num = reader.read_int(3)
 
-        reader._pos = 1024
+# probe reads only the 1024 byte file header, None is returned for files that are not meshes
+def probe(filename: str) -> Optional[MSHInfo]:
+    with open(filename, mode="rb") as file:
+        data = file.read(1024)
 
-        self.bones = [Bone.read(reader) for _ in range(bones_num)]
-        self.meshes = [Mesh.read(reader) for _ in range(meshes_num)]
-        self.collisions = [Collision.read(reader, self.version) for _ in range(cols_num)]
-        self.dummies = [Dummy.read(reader, self.version) for _ in range(dummies_num)]
+    if len(data) < MSH_HEADER.size:
+        return None
 
-    def save_memory(self) -> bytes:
-        writer = Writer()
+    with Reader(data) as reader:
+        file_type, version, meshes_num, lods_num, uv_ani, bb_max, bb_min, bones_num, cols_num, dummies_num = \
+            MSH_HEADER.read(reader)
 
-        writer.write_string(self.file_type, 256)
-        writer.write_int(self.version)
+    if not file_type.startswith("Eternity Engine Mesh File"):
+        return None
 
-        writer.write_int((len(self.meshes), 1, 0))
+    return MSHInfo(file_type, version, meshes_num, bones_num, cols_num, dummies_num, bb_max, bb_min)
 
-        self.bb_max.write(writer)
-        self.bb_min.write(writer)
 
-        writer.write_int((len(self.bones), len(self.collisions), len(self.dummies)))
-        writer.write_bytes(b'\0' * (1024 - len(writer.data)))
+class MSH:
 
-        for bone in self.bones:
-            bone.write(writer)
+    def load_memory(self, data: bytes):
+        with Reader(data) as reader:
+            if reader.buffered() < MSH_HEADER.size:
+                return
+
+            header = MSH_HEADER.read(reader)
+            if not header[0].startswith("Eternity Engine Mesh File"):
+                return
+
+            self.file_type, self.version, meshes_num, lods_num, uv_ani, self.bb_max, self.bb_min, \
+                bones_num, cols_num, dummies_num = header
+
+            self.bones = BoneTable.read(reader, bones_num)
+            self.meshes = [Mesh.read(reader) for _ in range(meshes_num)]
+            self.collisions = [Collision.read(reader, self.version) for _ in range(cols_num)]
+            self.dummies = DummyTable.read(reader, dummies_num, self.version)
+
+    def _write_header(self, writer: Writer):
+        MSH_HEADER.write(writer, (
+            self.file_type, self.version,
+            len(self.meshes), 1, 0,
+            self.bb_max, self.bb_min,
+            len(self.bones), len(self.collisions), len(self.dummies),
+        ))
+
+    # sections yields the file in (size, write_func) parts, mesh strips are encoded as each mesh is reached
+    # mesh_workers other than 1 stripifies all meshes up front instead, that many at once (see stripify_meshes)
+    def sections(self, strip_workers: Optional[int] = 1, mesh_workers: Optional[int] = 1):
+        yield MSH_HEADER.size, self._write_header
+
+        bones = self.bones if isinstance(self.bones, BoneTable) else BoneTable.from_bones(self.bones)
+        yield bones.calc_size(), bones.write
+
+        strips = {}
+        if mesh_workers != 1:
+            strip_workers = 1
+            meshes = [mesh for mesh in self.meshes if mesh.use_tristrip and mesh.indices is None]
+            strips = dict(zip(map(id, meshes), stripify_meshes(meshes, mesh_workers)))
 
         for mesh in self.meshes:
-            mesh.write(writer)
+            indices = strips.get(id(mesh))
+            if indices is None:
+                indices = mesh.encode_indices(strip_workers)
+            yield mesh.calc_size(indices), partial(mesh.write, indices=indices)
 
         for collision in self.collisions:
-            collision.write(writer, self.version)
+            yield collision.calc_size(self.version), partial(collision.write, version=self.version)
 
-        for dummy in self.dummies:
-            dummy.write(writer, self.version)
+        dummies = self.dummies if isinstance(self.dummies, DummyTable) else DummyTable.from_dummies(self.dummies)
+        yield dummies.calc_size(self.version), partial(dummies.write, version=self.version)
 
-        return writer.data
+    def save_memory(self, strip_workers: Optional[int] = 1, mesh_workers: Optional[int] = 1) -> bytes:
+        return write_sections(self.sections(strip_workers, mesh_workers))
 
     def load_file(self, filename: str):
-        with open(filename, mode="rb") as file:
-            data = file.read()
+        with map_file(filename) as data:
             self.load_memory(data)
 
-    def save_file(self, filename: str):
+    def save_file(self, filename: str, strip_workers: Optional[int] = 1, mesh_workers: Optional[int] = 1):
         with open(filename, mode="wb") as file:
-            data = self.save_memory()
-            file.write(data)
+            stream_sections(file, self.sections(strip_workers, mesh_workers))
 
     def clear(self):
         self.file_type = ""
@@ -401,3 +723,55 @@ class MSH:
 
     def __init__(self):
         self.clear()
+
+
+class LazyMSH(MSH):
+    """MSH that only indexes the section offsets when loaded, bones, meshes, collisions and dummies
+    are read on first access. The file stays mapped until close() is called."""
+
+    @staticmethod
+    def _index(reader: Reader, num: int, skip_func):
+        offsets = []
+        for _ in range(num):
+            offsets.append(reader.tell())
+            skip_func(reader)
+        return offsets
+
+    def load_memory(self, data: bytes):
+        with Reader(data) as reader:
+            if reader.buffered() < MSH_HEADER.size:
+                return
+
+            header = MSH_HEADER.read(reader)
+            if not header[0].startswith("Eternity Engine Mesh File"):
+                return
+
+            self.file_type, self.version, meshes_num, lods_num, uv_ani, self.bb_max, self.bb_min, \
+                bones_num, cols_num, dummies_num = header
+
+            bones_offsets = self._index(reader, bones_num, Bone.skip)
+            meshes_offsets = self._index(reader, meshes_num, Mesh.skip)
+            cols_offsets = self._index(reader, cols_num, partial(Collision.skip, version=self.version))
+            dummies_offsets = self._index(reader, dummies_num, partial(Dummy.skip, version=self.version))
+
+        self.bones = LazyRecords(data, bones_offsets, Bone.read)
+        self.meshes = LazyRecords(data, meshes_offsets, Mesh.read)
+        self.collisions = LazyRecords(data, cols_offsets, partial(Collision.read, version=self.version))
+        self.dummies = LazyRecords(data, dummies_offsets, partial(Dummy.read, version=self.version))
+
+    def load_file(self, filename: str):
+        self.close()
+        self.load_memory(self._files.enter_context(map_file(filename)))
+
+    def close(self):
+        self._files.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __init__(self):
+        self._files = ExitStack()
+        super().__init__()
@@ -0,0 +1,101 @@
+"""A greedy triangle stripifier on integer adjacency arrays.
+
+Every face is visited a bounded number of times, so the running time grows
+linearly with the number of faces. The strips are usually somewhat shorter
+than those of the NvTriStrip port in trianglestripifier, which is why that
+one is still used for small meshes (see tristrip.STRIPIFIERS)."""
+
+import heapq
+
+from .trianglemesh import ArrayMesh
+
+def _walk(faces, adjacency, used, face, p, q):
+    """Walk from face across its edge p, q and onwards for as long as
+    unused faces follow. Returns the new strip vertices and their faces."""
+    verts = []
+    walked = []
+    while True:
+        v0, v1, v2 = faces[face]
+        if (v0 == p or v0 == q) and (v1 == p or v1 == q):
+            nextface = adjacency[face][0]
+        elif (v1 == p or v1 == q) and (v2 == p or v2 == q):
+            nextface = adjacency[face][1]
+        else:
+            nextface = adjacency[face][2]
+        if nextface < 0 or used[nextface]:
+            return verts, walked
+        w0, w1, w2 = faces[nextface]
+        x = w0 + w1 + w2 - p - q
+        used[nextface] = True
+        verts.append(x)
+        walked.append(nextface)
+        face, p, q = nextface, q, x
+
+def stripify(triangles):
+    """Converts triangles into a list of strips.
+
+    >>> from .tristrip import _check_strips
+    >>> triangles = [(0,1,4),(1,2,4),(2,3,4),(3,0,4)]
+    >>> strips = stripify(triangles)
+    >>> _check_strips(triangles, strips)
+    >>> triangles = [(0, 1, 2), (2, 1, 0), (1, 2, 3)]
+    >>> strips = stripify(triangles)
+    >>> _check_strips(triangles, strips)
+    >>> # 4x4 grid of quads
+    >>> triangles = [t for i in range(4) for j in range(4)
+    ...              for t in ((5*i+j, 5*i+j+5, 5*i+j+1),
+    ...                        (5*i+j+1, 5*i+j+5, 5*i+j+6))]
+    >>> strips = stripify(triangles)
+    >>> _check_strips(triangles, strips)
+    >>> len(strips)
+    4
+    >>> stripify([])
+    []
+    """
+    mesh = ArrayMesh(triangles)
+    # number of unused neighbours, faces with few are started first
+    degrees = (mesh.twins >= 0).sum(axis=1).tolist()
+    faces = mesh.verts.tolist()
+    adjacency = mesh.twins.tolist()
+    used = [False] * len(faces)
+
+    def mark_used(walked):
+        for face in walked:
+            for other in adjacency[face]:
+                if other >= 0 and not used[other]:
+                    degrees[other] -= 1
+                    heapq.heappush(queue, (degrees[other], other))
+
+    queue = [(degree, face) for face, degree in enumerate(degrees)]
+    heapq.heapify(queue)
+
+    strips = []
+    while queue:
+        degree, face = heapq.heappop(queue)
+        if used[face] or degree != degrees[face]:
+            continue
+        used[face] = True
+        # leave through the edge towards the neighbour with fewest options
+        best = None
+        for k, other in enumerate(adjacency[face]):
+            if other >= 0 and not used[other]:
+                if best is None or degrees[other] < degrees[adjacency[face][best]]:
+                    best = k
+        k = 0 if best is None else best
+        # strip a, b, c enters through edge a, b and leaves through b, c
+        a, b, c = faces[face][k - 1], faces[face][k], faces[face][(k + 1) % 3]
+        forward_verts, forward_faces = _walk(faces, adjacency, used, face, b, c)
+        backward_verts, backward_faces = _walk(faces, adjacency, used, face, b, a)
+        # an odd number of faces in front would flip the winding of the
+        # whole strip, so give the outermost one back
+        if len(backward_faces) & 1:
+            used[backward_faces.pop()] = False
+            backward_verts.pop()
+        backward_verts.reverse()
+        strips.append(backward_verts + [a, b, c] + forward_verts)
+        mark_used([face] + backward_faces + forward_faces)
+    return strips
+
+if __name__=='__main__':
+    import doctest
+    doctest.testmod()
@@ -66,8 +66,11 @@
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 import operator # itemgetter
+from collections.abc import Sequence
 from weakref import WeakSet
 
+import numpy as np
+
 
 class Edge:
     """A directed edge which keeps track of its faces."""
@@ -339,6 +342,167 @@ class Mesh:
                     #if id(face) in adj_adj_faces.data:
                     #    del adj_adj_faces.data[id(face)]
 
+def canonical_faces(triangles, return_index=False):
+    """Returns the non-degenerate faces as an (N, 3) int64 array, each face
+    rotated so its lowest index comes first, with duplicates removed and
+    sorted, so in the same order as the faces of a locked :class:`Mesh`.
+    If return_index is True, also returns for every face the position of
+    its first occurrence among the non-degenerate triangles.
+
+    >>> canonical_faces([(2, 1, 3), (1, 3, 2), (4, 4, 5), (9, 8, 7)]).tolist()
+    [[1, 3, 2], [7, 9, 8]]
+    >>> canonical_faces([(9, 8, 7), (4, 4, 5), (2, 1, 3)], True)[1].tolist()
+    [1, 0]
+    """
+    faces = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    faces = faces[(faces[:, 0] != faces[:, 1])
+                  & (faces[:, 1] != faces[:, 2])
+                  & (faces[:, 2] != faces[:, 0])]
+    if len(faces) == 0:
+        return (faces, np.zeros(0, dtype=np.int64)) if return_index else faces
+    shift = np.argmin(faces, axis=1)
+    rows = np.arange(len(faces))[:, None]
+    faces = faces[rows, (shift[:, None] + np.arange(3)) % 3]
+    return np.unique(faces, axis=0, return_index=return_index)
+
+class ArrayFace:
+    """A face of an :class:`ArrayMesh`, a view on its arrays with the
+    same interface as :class:`Face`."""
+
+    __slots__ = ('mesh', 'index')
+
+    def __init__(self, mesh, index):
+        self.mesh = mesh
+        self.index = index
+
+    @property
+    def verts(self):
+        return tuple(self.mesh.verts[self.index].tolist())
+
+    def __repr__(self):
+        """String representation.
+
+        >>> ArrayMesh([(3, 1, 2)]).faces[0]
+        Face(1, 2, 3)
+        """
+        return "Face(%s, %s, %s)" % self.verts
+
+    def __eq__(self, other):
+        return self.mesh is other.mesh and self.index == other.index
+
+    def __hash__(self):
+        return self.index
+
+    def get_next_vertex(self, vi):
+        """Get next vertex of face.
+
+        >>> ArrayMesh([(8, 7, 5)]).faces[0].get_next_vertex(8)
+        7
+        """
+        return self.verts[(1, 2, 0)[self.verts.index(vi)]]
+
+    def get_adjacent_faces(self, vi):
+        """Get adjacent faces, that are not discarded, associated with the
+        edge opposite a vertex."""
+        mesh = self.mesh
+        half_edge = 3 * self.index + (1, 2, 0)[self.verts.index(vi)]
+        start, stop = mesh.adjacency_start[half_edge:half_edge + 2].tolist()
+        for index in mesh.adjacency[start:stop].tolist():
+            if mesh.alive[index]:
+                yield ArrayFace(mesh, index)
+
+class _ArrayFaces(Sequence):
+    """The faces of an :class:`ArrayMesh`, discarded faces are None."""
+
+    def __init__(self, mesh):
+        self.mesh = mesh
+
+    def __len__(self):
+        return len(self.mesh.verts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not self.mesh.alive[index]:
+            return None
+        return ArrayFace(self.mesh, index)
+
+class ArrayMesh:
+    """A locked mesh stored as integer arrays, for use in place of
+    :class:`Mesh` by the stripifiers. All arrays are built in one pass
+    without creating an object per face or edge.
+
+    Half-edge k of face f runs from verts[f, k] to verts[f, k + 1], so it
+    is opposite verts[f, k + 2], and has index 3 * f + k.
+
+    :ivar verts: (N, 3) array of face vertices, faces ordered as in a
+        locked :class:`Mesh`.
+    :ivar twins: (N, 3) array, for every half-edge the first face having
+        the reversed edge, or -1 if there is none.
+    :ivar adjacency: Faces having the reversed edge of each half-edge,
+        which are adjacency[adjacency_start[h]:adjacency_start[h + 1]],
+        in ascending face index.
+    :ivar alive: Boolean array, False for discarded faces.
+
+    >>> m = ArrayMesh([(0, 1, 2), (2, 1, 3), (2, 3, 4), (1, 0, 5), (0, 1, 2)])
+    >>> m
+    Mesh(faces=[(0, 1, 2), (0, 5, 1), (1, 3, 2), (2, 3, 4)])
+    >>> m.twins.tolist()
+    [[1, 2, -1], [-1, -1, 0], [-1, 3, 0], [2, -1, -1]]
+    >>> list(m.faces[0].get_adjacent_faces(0))
+    [Face(1, 3, 2)]
+    >>> m.discard_face(m.faces[2])
+    >>> list(m.faces[0].get_adjacent_faces(0))
+    []
+    >>> m.faces[2] is None
+    True
+    >>> triangles = [(4, 2, 1), (0, 4, 1), (3, 4, 1)]
+    >>> list(ArrayMesh(triangles).faces[2].get_adjacent_faces(2))
+    [Face(0, 4, 1), Face(1, 3, 4)]
+    """
+
+    def __init__(self, faces=()):
+        verts = canonical_faces(faces)
+        num_faces = len(verts)
+
+        starts = verts.ravel()
+        ends = np.roll(verts, -1, axis=1).ravel()
+        base = int(verts.max()) + 1 if num_faces else 1
+        keys = starts * base + ends
+        reversed_keys = ends * base + starts
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+        lower = np.searchsorted(sorted_keys, reversed_keys, 'left')
+        upper = np.searchsorted(sorted_keys, reversed_keys, 'right')
+        counts = upper - lower
+
+        self.adjacency_start = np.zeros(3 * num_faces + 1, dtype=np.int32)
+        np.cumsum(counts, out=self.adjacency_start[1:])
+        # position of every adjacent face in the sorted half-edges
+        positions = (np.arange(self.adjacency_start[-1])
+                     + np.repeat(lower - self.adjacency_start[:-1], counts))
+        # the stable sort keeps the neighbours along an edge in ascending
+        # face index, the stripifier takes the first unstripped one
+        self.adjacency = (order[positions] // 3).astype(np.int32)
+        self.twins = np.where(counts > 0,
+                              order[np.minimum(lower, max(len(keys) - 1, 0))] // 3,
+                              -1).astype(np.int32).reshape(-1, 3)
+        self.verts = verts.astype(np.int32)
+        self.alive = np.ones(num_faces, dtype=bool)
+        self.faces = _ArrayFaces(self)
+
+    def __repr__(self):
+        return ("Mesh(faces=[%s])"
+                % ', '.join(repr(tuple(verts))
+                            for verts in self.verts.tolist()))
+
+    def discard_face(self, face):
+        """Remove the face from the mesh, other face indices remain
+        valid."""
+        self.alive[face.index] = False
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
@@ -47,11 +47,6 @@ output in all circumstances.
 #
 # ***** END LICENSE BLOCK *****
 
-import itertools
-import random # choice
-
-from .trianglemesh import Face, Mesh
-
 class TriangleStrip(object):
     """A heavily specialized oriented strip of faces.
 
@@ -130,6 +125,7 @@ class TriangleStrip(object):
         Check case of single triangle
         -----------------------------
 
+        >>> from .trianglemesh import Mesh
         >>> m = Mesh()
         >>> face = m.add_face(0, 1, 2)
         >>> m.lock()
@@ -318,6 +314,7 @@ class Experiment(object):
     def build(self):
         """Build strips, starting from start_vertex and start_face.
 
+        >>> from .trianglemesh import Mesh
         >>> m = Mesh()
         >>> tmp = m.add_face(2, 1, 7)
         >>> s1_face = m.add_face(0, 1, 2)
@@ -473,6 +470,7 @@ class TriangleStripifier(object):
         Empty mesh
         ----------
 
+        >>> from .trianglemesh import ArrayMesh, Mesh
         >>> m = Mesh()
         >>> m.lock()
         >>> ts = TriangleStripifier(m)
@@ -506,6 +504,18 @@ class TriangleStripifier(object):
         >>> ts = TriangleStripifier(m)
         >>> sorted(ts.find_all_strips())
         [[3, 2, 5], [4, 22, 2, 21, 0, 24, 9], [9, 0, 8], [11, 4, 7, 2, 1, 0, 8, 10, 11], [32, 8, 31, 11, 33]]
+
+        Same mesh, array backed
+        -----------------------
+
+        >>> m = ArrayMesh([(2, 1, 7), (0, 1, 2), (2, 7, 4), (4, 7, 11),
+        ...                (5, 3, 2), (1, 0, 8), (0, 8, 9), (8, 0, 10),
+        ...                (10, 11, 8), (0, 2, 21), (21, 2, 22), (2, 4, 22),
+        ...                (21, 24, 0), (9, 0, 24), (8, 11, 31), (8, 31, 32),
+        ...                (31, 11, 33)])
+        >>> ts = TriangleStripifier(m)
+        >>> sorted(ts.find_all_strips())
+        [[3, 2, 5], [4, 22, 2, 21, 0, 24, 9], [9, 0, 8], [11, 4, 7, 2, 1, 0, 8, 10, 11], [32, 8, 31, 11, 33]]
         """
         all_strips = []
         selector = ExperimentSelector()
@@ -39,12 +39,24 @@ and triangulation of strips."""
 #
 # ***** END LICENSE BLOCK *****
 
+import heapq
+import multiprocessing.context
+import multiprocessing.spawn
+import numpy as np
+import os
+
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from . import greedystrip
+from .trianglestripifier import TriangleStripifier
+from .trianglemesh import ArrayMesh, canonical_faces
+
 try:
     import pytristrip
 except ImportError:
     pytristrip = None
-    from .trianglestripifier import TriangleStripifier
-    from .trianglemesh import Mesh
 
 def triangulate(strips):
     """A generator for iterating over the faces in a set of
@@ -57,21 +69,32 @@ def triangulate(strips):
     triangles = []
 
     for strip in strips:
-        if len(strip) < 3: continue # skip empty strips
-        # make list copy incase input data does not like slice notation
-        strip_list = list(strip)
-        # flips the order of verts in every other tri
-        flip = False
-        for i in range(0, len(strip_list)-2):
-            flip = not flip
-            t0, t1, t2 = strip_list[i:i+3]
-            # skip degenerate tri
-            if t0 == t1 or t1 == t2 or t2 == t0: continue
-            # append tri in correct order
-            triangles.append((t0, t1, t2) if flip else (t0, t2, t1))
+        triangles.extend(tuple(t) for t in triangulate_array(strip).tolist())
 
     return triangles
 
+def triangulate_array(strip):
+    """Decode a single strip into an array of faces, in bulk. Every other
+    triangle has its winding flipped, and degenerate triangles are
+    discarded.
+
+    >>> triangulate_array([1, 0, 1, 2, 3, 4, 5, 6]).tolist()
+    [[0, 2, 1], [1, 2, 3], [2, 4, 3], [3, 4, 5], [4, 6, 5]]
+    >>> triangulate_array([0, 1]).shape
+    (0, 3)
+    """
+    strip = np.asarray(strip)
+    if len(strip) < 3:
+        return np.empty((0, 3), dtype=strip.dtype)
+    t0, t1, t2 = strip[:-2], strip[1:-1], strip[2:]
+    # flips the order of verts in every other tri
+    flip = (np.arange(len(t0)) & 1).astype(bool)
+    # skip degenerate tris
+    keep = (t0 != t1) & (t1 != t2) & (t2 != t0)
+    triangles = np.column_stack(
+        (t0, np.where(flip, t2, t1), np.where(flip, t1, t2)))
+    return triangles[keep]
+
 def _generate_faces_from_triangles(triangles):
     """Creates faces (tris) from a flat list of non-overlapping triangle indices"""
     for i in range(0, len(triangles), 3):
@@ -139,12 +162,94 @@ def _check_strips(triangles, strips):
                triangles - strips_triangles,
                strips_triangles - triangles))
 
-def stripify(triangles, stitchstrips = False):
+def compare_strips(triangles, strips):
+    """Compares the faces of strips with triangles, like _check_strips
+    but on arrays so that it is fast enough for every export. Returns
+    the faces missing from the strips and the extra faces in the strips
+    as (N, 3) arrays, each face rotated so its lowest index comes first.
+    Degenerate and duplicate faces are ignored.
+
+    >>> missing, extra = compare_strips([(0,1,2),(2,1,3),(1,0,1)], [[0,1,2,3]])
+    >>> missing.tolist(), extra.tolist()
+    ([], [])
+    >>> missing, extra = compare_strips([(0,1,2),(2,1,3),(2,3,4)], [[0,1,2,3,3,5,6]])
+    >>> missing.tolist(), extra.tolist()
+    ([[2, 3, 4]], [[3, 5, 6]])
+    >>> missing, extra = compare_strips([(0,1,2),(2,1,3)], [[3,2,1,0,1]])
+    >>> missing.tolist(), extra.tolist()
+    ([], [])
+    """
+    faces = canonical_faces(triangles)
+    strip_faces = [triangulate_array(np.asarray(strip, dtype=np.int64)) for strip in strips]
+    strip_faces = canonical_faces(np.concatenate(strip_faces) if strip_faces else ())
+
+    # pack every face into one integer to compare them as sets
+    base = max(int(faces.max(initial=0)), int(strip_faces.max(initial=0))) + 1
+    keys = (faces[:, 0] * base + faces[:, 1]) * base + faces[:, 2]
+    strip_keys = (strip_faces[:, 0] * base + strip_faces[:, 1]) * base + strip_faces[:, 2]
+
+    return (faces[~np.isin(keys, strip_keys, assume_unique=True)],
+            strip_faces[~np.isin(strip_keys, keys, assume_unique=True)])
+
+def _stripify_nvtristrip(triangles):
+    """Python port of NvTriStrip, slow but finds long strips."""
+    # build a mesh from triangles, degenerate faces are dropped
+    mesh = ArrayMesh(triangles)
+
+    # calculate the strip
+    stripifier = TriangleStripifier(mesh)
+    return stripifier.find_all_strips()
+
+# (name, maximum number of triangles or None for any, function) in order of
+# preference; the NvTriStrip port samples the whole mesh for every strip it
+# starts, which takes minutes on large meshes, so those go to the linear
+# greedy stripifier instead
+STRIPIFIERS = [
+    ('nvtristrip', 2048, _stripify_nvtristrip),
+    ('greedy', None, greedystrip.stripify),
+]
+if pytristrip:
+    STRIPIFIERS.insert(0, ('pytristrip', None, pytristrip.stripify))
+
+def _find_stripifier(num_triangles, backend):
+    for name, max_triangles, func in STRIPIFIERS:
+        if backend is None:
+            if max_triangles is None or num_triangles <= max_triangles:
+                return name, func
+        elif name == backend:
+            return name, func
+    raise ValueError("unknown stripifier %r" % backend)
+
+def get_stripifier(num_triangles, backend=None):
+    """Returns the stripify function of the named backend, or of the
+    preferred backend for a mesh with num_triangles triangles.
+
+    >>> get_stripifier(100, 'greedy') is greedystrip.stripify
+    True
+    >>> get_stripifier(10 ** 6) in (greedystrip.stripify, getattr(pytristrip, 'stripify', None))
+    True
+    """
+    return _find_stripifier(num_triangles, backend)[1]
+
+def get_stripifier_name(num_triangles, backend=None):
+    """Returns the name of the backend get_stripifier picks.
+
+    >>> get_stripifier_name(100) in ('nvtristrip', 'pytristrip')
+    True
+    >>> get_stripifier_name(100, 'greedy')
+    'greedy'
+    """
+    return _find_stripifier(num_triangles, backend)[0]
+
+def stripify(triangles, stitchstrips = False, backend = None):
     """Converts triangles into a list of strips.
 
     If stitchstrips is True, then everything is wrapped in a single strip using
     degenerate triangles.
 
+    The backend is looked up in STRIPIFIERS by name, or if backend is None,
+    the first one that accepts the number of triangles is used.
+
     >>> triangles = [(0,1,4),(1,2,4),(2,3,4),(3,0,4)]
     >>> strips = stripify(triangles)
     >>> _check_strips(triangles, strips)
@@ -174,25 +279,130 @@ def stripify(triangles, stitchstrips = False):
     ...              (356, 355, 357), (357, 356, 355), (356, 355, 357), (356, 355, 357), (357, 356, 355)]
     >>> strips = stripify(triangles)
     >>> _check_strips(triangles, strips) # NvTriStrip gives wrong result
+    >>> strips = stripify(triangles, backend='greedy')
+    >>> _check_strips(triangles, strips)
+    >>> stripify(triangles, backend='unknown')
+    Traceback (most recent call last):
+        ...
+    ValueError: unknown stripifier 'unknown'
     """
 
-    if pytristrip:
-        strips = pytristrip.stripify(triangles)
+    strips = get_stripifier(len(triangles), backend)(triangles)
+
+    # stitch the strips if needed
+    if stitchstrips:
+        return [stitch_strips(strips)]
+    else:
+        return strips
+
+def _morton_codes(points, bits=10):
+    """Interleave the bits of points quantized to a grid over their
+    bounding box, so that sorting by code keeps nearby points together.
+
+    >>> _morton_codes(np.array([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 1]]), 1).tolist()
+    [0, 1, 2, 7]
+    """
+    lower = points.min(axis=0)
+    extent = float((points.max(axis=0) - lower).max()) or 1.0
+    grid = ((points - lower) * (((1 << bits) - 1) / extent)).astype(np.uint64)
+    codes = np.zeros(len(points), dtype=np.uint64)
+    for bit in range(bits):
+        for axis in range(3):
+            codes |= ((grid[:, axis] >> np.uint64(bit)) & np.uint64(1)) << np.uint64(3 * bit + axis)
+    return codes
+
+def partition_triangles(triangles, positions=None, cluster_size=2048):
+    """Split triangles into (N, 3) arrays of at most cluster_size
+    triangles which are close together, ordered along a Morton curve
+    through the triangle centers. Without positions, triangles are
+    ordered by their lowest vertex index instead.
+
+    >>> clusters = partition_triangles(
+    ...     [(0, 1, 2), (6, 7, 8), (2, 1, 3), (8, 7, 9)],
+    ...     [(0, 0, 0), (1, 0, 0), (0, 1, 0), (1, 1, 0), (0, 0, 0),
+    ...      (0, 0, 0), (9, 0, 0), (10, 0, 0), (9, 1, 0), (10, 1, 0)], 2)
+    >>> [cluster.tolist() for cluster in clusters]
+    [[[0, 1, 2], [2, 1, 3]], [[6, 7, 8], [8, 7, 9]]]
+    """
+    faces = np.asarray(triangles, dtype=np.int64).reshape(-1, 3)
+    if positions is None:
+        keys = faces.min(axis=1)
+    else:
+        points = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        keys = _morton_codes(points[faces].mean(axis=1))
+    order = np.argsort(keys, kind='stable')
+    num_clusters = max(1, -(-len(faces) // cluster_size))
+    return [faces[cluster] for cluster in np.array_split(order, num_clusters)]
+
+# the Python that worker processes run, None for sys.executable; the
+# add-on sets it where sys.executable is Blender itself
+worker_executable = None
+
+class _SpawnProcess(multiprocessing.context.SpawnProcess):
+    """A spawned process running worker_executable. multiprocessing keeps
+    its executable for the whole interpreter, so it is only swapped in
+    while the process is launched, other users of multiprocessing keep
+    theirs."""
+
+    @staticmethod
+    def _Popen(process_obj):
+        previous = multiprocessing.spawn.get_executable()
+        if worker_executable is not None:
+            multiprocessing.spawn.set_executable(worker_executable)
+        try:
+            return multiprocessing.context.SpawnProcess._Popen(process_obj)
+        finally:
+            multiprocessing.spawn.set_executable(previous)
+
+class _SpawnContext(multiprocessing.context.SpawnContext):
+    Process = _SpawnProcess
+
+def worker_context():
+    """Returns the multiprocessing context of the worker pools. Workers
+    are spawned rather than forked, forking Blender copies its threads'
+    locks, and only import the types package."""
+    return _SpawnContext()
+
+def _stripify_cluster(cluster, backend):
+    """Runs in the worker processes of stripify_parallel, the cluster is
+    sent as an array, which pickles much smaller than a list."""
+    return stripify(cluster.tolist(), backend=backend)
+
+def stripify_parallel(triangles, stitchstrips=False, positions=None,
+                      max_workers=None, cluster_size=None, backend=None):
+    """Like stripify, but partitions the triangles into spatially close
+    clusters first and stripifies those in a pool of max_workers
+    processes (all cores if None). The strips of the clusters are joined
+    by stitch_strips as usual. Every worker gets one cluster unless
+    cluster_size is given, as each cluster border costs stitching
+    indices. Unless backend is given, every cluster goes to the backend
+    stripify would pick for all triangles, so a large mesh is not handed
+    to the slow NvTriStrip port piece by piece.
+
+    >>> triangles = [t for i in range(8) for j in range(8)
+    ...              for t in ((9*i+j, 9*i+j+9, 9*i+j+1),
+    ...                        (9*i+j+1, 9*i+j+9, 9*i+j+10))]
+    >>> positions = [(j, i, 0) for i in range(9) for j in range(9)]
+    >>> strips = stripify_parallel(triangles, True, positions, 2, 32)
+    >>> _check_strips(triangles, strips)
+    >>> len(strips)
+    1
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if cluster_size is None:
+        cluster_size = max(1, -(-len(triangles) // max_workers))
+    clusters = partition_triangles(triangles, positions, cluster_size)
+    stripify_cluster = partial(
+        _stripify_cluster,
+        backend=get_stripifier_name(len(triangles), backend))
+    if len(clusters) == 1:
+        strips = stripify_cluster(clusters[0])
     else:
-        strips = []
-        # build a mesh from triangles
-        mesh = Mesh()
-        for face in triangles:
-            try:
-                mesh.add_face(*face)
-            except ValueError:
-                # degenerate face
-                pass
-        mesh.lock()
-
-        # calculate the strip
-        stripifier = TriangleStripifier(mesh)
-        strips = stripifier.find_all_strips()
+        with ProcessPoolExecutor(max_workers, mp_context=worker_context()) as pool:
+            strips = [strip
+                      for cluster_strips in pool.map(stripify_cluster, clusters)
+                      for strip in cluster_strips]
 
     # stitch the strips if needed
     if stitchstrips:
@@ -397,6 +607,10 @@ class OrientedStrip:
 def stitch_strips(strips):
     """Stitch strips keeping stitch size minimal.
 
+    Strips are joined to the result one at a time, picking the join with
+    fewest stitches; strip endpoints are indexed by vertex and winding so
+    that each join is found without scanning the remaining strips.
+
     >>> # stitch length 0 code path
     >>> stitch_strips([[3,4,5],[0,1,2,3]])
     [0, 1, 2, 3, 3, 4, 5]
@@ -431,23 +645,6 @@ def stitch_strips(strips):
     [0, 1, 2, 2, 9, 9, 8, 7]
     """
 
-    class ExperimentSelector:
-        """Helper class to select best experiment."""
-        def __init__(self):
-            self.best_ostrip1 = None
-            self.best_ostrip2 = None
-            self.best_num_stitches = None
-            self.best_ostrip_index = None
-
-        def update(self, ostrip_index, ostrip1, ostrip2):
-            num_stitches = ostrip1.get_num_stitches(ostrip2)
-            if ((self.best_num_stitches is None)
-                or (num_stitches < self.best_num_stitches)):
-                self.best_ostrip1 = ostrip1
-                self.best_ostrip2 = ostrip2
-                self.best_ostrip_index = ostrip_index
-                self.best_num_stitches = num_stitches
-
     # get all strips and their orientation, and their reverse
     ostrips = [(OrientedStrip(strip), OrientedStrip(strip))
                for strip in strips if len(strip) >= 3]
@@ -458,25 +655,74 @@ def stitch_strips(strips):
         # no strips!
         return []
     result = ostrips.pop()[0]
-    # go on as long as there are strips left to process
-    while ostrips:
-        selector = ExperimentSelector()
-
-        for ostrip_index, (ostrip, reversed_ostrip) in enumerate(ostrips):
-            # try various ways of stitching strips
-            selector.update(ostrip_index, result, ostrip)
-            selector.update(ostrip_index, ostrip, result)
-            selector.update(ostrip_index, result, reversed_ostrip)
-            selector.update(ostrip_index, reversed_ostrip, result)
-            # break early if global optimum is already reached
-            if selector.best_num_stitches == 0:
+    vertices = deque(result.vertices)
+    reversed_ = result.reversed
+
+    # the ways to stitch a strip to result are ranked as append, prepend,
+    # append reversed, prepend reversed; of those needing the fewest
+    # stitches the first rank of the first strip is taken, so joins are
+    # looked up by the strip endpoints and winding that they need
+    append_exact = defaultdict(list)
+    append_vertex = defaultdict(list)
+    append_winding = defaultdict(list)
+    prepend_exact = defaultdict(list)
+    prepend_vertex = defaultdict(list)
+    prepend_winding = defaultdict(list)
+    for index, (ostrip, reversed_ostrip) in enumerate(ostrips):
+        for rank, other in ((0, ostrip), (2, reversed_ostrip)):
+            first = other.vertices[0]
+            append_exact[first, other.reversed].append((index, rank))
+            append_vertex[first].append((index, rank))
+            append_winding[other.reversed].append((index, rank))
+        for rank, other in ((1, ostrip), (3, reversed_ostrip)):
+            last = other.vertices[-1]
+            winding = other.reversed != (len(other.vertices) & 1 == 1)
+            prepend_exact[last, winding].append((index, rank))
+            prepend_vertex[last].append((index, rank))
+            prepend_winding[winding].append((index, rank))
+    # the lists are filled in order so they are heaps already, joins with
+    # strips that were used are only popped once they come up
+    remaining = [(index, 0) for index in range(len(ostrips))]
+    used = [False] * len(ostrips)
+
+    def first_join(*candidates):
+        best = None
+        for heap in candidates:
+            while heap and used[heap[0][0]]:
+                heapq.heappop(heap)
+            if heap and (best is None or heap[0] < best):
+                best = heap[0]
+        return best
+
+    for _ in range(len(ostrips)):
+        # winding at the end of result, as in get_num_stitches
+        end_winding = reversed_ != (len(vertices) & 1 == 1)
+        first, last = vertices[0], vertices[-1]
+        for num_stitches, join in enumerate((
+                first_join(append_exact.get((last, end_winding), ()),
+                           prepend_exact.get((first, reversed_), ())),
+                first_join(append_vertex.get(last, ()),
+                           prepend_vertex.get(first, ())),
+                first_join(append_winding.get(end_winding, ()),
+                           prepend_winding.get(reversed_, ())),
+                first_join(remaining))):
+            if join is not None:
                 break
-        # get best result, perform the actual stitching, and remove
-        # strip from ostrips
-        result = selector.best_ostrip1 + selector.best_ostrip2
-        ostrips.pop(selector.best_ostrip_index)
+        index, rank = join
+        used[index] = True
+        other = ostrips[index][rank >> 1]
+        if rank & 1:
+            stitches = [other.vertices[-1], first, first][:num_stitches]
+            vertices.extendleft(reversed(other.vertices + stitches))
+            reversed_ = other.reversed
+        else:
+            stitches = [last, other.vertices[0], other.vertices[0]][:num_stitches]
+            vertices.extend(stitches)
+            vertices.extend(other.vertices)
     # get strip
-    strip = list(result)
+    strip = list(vertices)
+    if reversed_:
+        strip.insert(0, strip[0])
     # check if we can remove first vertex by reversing strip
     if strip[0] == strip[1] and (len(strip) & 1 == 0):
         strip = strip[1:]
@@ -1,18 +1,58 @@
-from struct import unpack_from
+import mmap
+import numpy as np
+import os
+import sys
+
+from collections.abc import Sequence
+from contextlib import contextmanager
+from functools import lru_cache
+from struct import Struct, unpack_from
 from typing import Tuple, Union
 
 
+@contextmanager
+def map_file(filename: str):
+    """Maps the file into memory read-only. Empty files yield an empty bytes object."""
+    with open(filename, mode="rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b''
+            return
+
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            yield data
+
+
+# decode_string turns a cp949 string field into a str without nulls. Names repeat a lot (bone names
+# appear in every mesh and animation of a character), so the results are interned and cached.
+@lru_cache(maxsize=4096)
+def decode_string(data: bytes) -> str:
+    return sys.intern(str(data, 'cp949').replace('\x00', ''))
+
+
 class Reader:
 
     # buffered returns the number of bytes that can be read from the current reader
     def buffered(self) -> int:
         return len(self._data) - self._pos
 
-    def read_bytes(self, size: int) -> bytes:
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, pos: int):
+        self._pos = pos
+
+    def skip(self, size: int):
+        self._pos = min(self._pos + size, len(self._data))
+
+    # view returns a zero-copy slice of the underlying buffer, valid until the reader is closed
+    def view(self, size: int) -> memoryview:
         data = self._data[self._pos:self._pos+size]
         self._pos += len(data)
         return data
 
+    def read_bytes(self, size: int) -> bytes:
+        return bytes(self.view(size))
+
     def read_float(self, num=1) -> Union[float, Tuple[float]]:
         data = unpack_from(f'<{num}f', self._data, self._pos)
         if num == 1:
@@ -41,15 +81,78 @@ class Reader:
         self._pos += 2 * num
         return data
 
+    # read_array reads count items of a little-endian numpy dtype (e.g. '<f4') in a single call
+    def read_array(self, dtype, count: int) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        data = np.frombuffer(self._data, dtype, count, self._pos).copy()
+        self._pos += dtype.itemsize * count
+        return data
+
+    def read_struct(self, layout: Struct) -> tuple:
+        data = layout.unpack_from(self._data, self._pos)
+        self._pos += layout.size
+        return data
+
+    # _find_null returns the position of the next null byte from pos, or -1 if there is none
+    def _find_null(self, pos: int) -> int:
+        if self._buffer is not None:
+            return self._buffer.find(b'\0', pos)
+
+        # NOTE: other buffers are searched in small copied chunks, never as a whole
+        while pos < len(self._data):
+            end = bytes(self._data[pos:pos+256]).find(b'\0')
+            if end >= 0:
+                return pos + end
+            pos += 256
+        return -1
+
     def read_string(self, size=None) -> str:
         if size is None:
-            pos, size = self._pos, 1
-            while self._data[pos] != 0:
-                pos += 1
-                size += 1
+            end = self._find_null(self._pos)
+            size = (end if end >= 0 else len(self._data)) - self._pos + 1
+
+        data = self.view(size)
+        if self._cache_strings:
+            return decode_string(bytes(data))
+        return str(data, 'cp949').replace('\x00', '')
+
+    def close(self):
+        self._data.release()
+
+    def __enter__(self):
+        return self
 
-        return self.read_bytes(size).decode('cp949').replace('\x00', '')
+    def __exit__(self, *args):
+        self.close()
 
-    def __init__(self, data):
+    def __init__(self, data, cache_strings=True):
         self._pos = 0
+        self._data = memoryview(data)
+        # NOTE: bytes, bytearray and mmap can search for the null terminator themselves
+        self._buffer = data if hasattr(data, 'find') else None
+        self._cache_strings = cache_strings
+
+
+class LazyRecords(Sequence):
+    """Records stored at known offsets of a buffer, each one is read on first access and then cached.
+    The buffer has to stay open for as long as records may still be read."""
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        record = self._records[index]
+        if record is None:
+            with Reader(self._data) as reader:
+                reader.seek(self._offsets[index])
+                record = self._records[index] = self._read_func(reader)
+        return record
+
+    def __init__(self, data, offsets, read_func):
         self._data = data
+        self._offsets = offsets
+        self._read_func = read_func
+        self._records = [None] * len(offsets)
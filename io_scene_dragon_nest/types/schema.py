@@ -0,0 +1,75 @@
+from struct import Struct
+from typing import Any, Callable, Optional, Sequence, Tuple
+
+from .reader import decode_string
+
+
+class Field:
+    """One field of a fixed-size record, a struct format plus the functions that turn its struct
+    items into a value and back. Padding fields (e.g. '496x') have no items and no value."""
+
+    def __init__(self, fmt: str, decode: Optional[Callable] = None, encode: Optional[Callable] = None):
+        self.fmt = fmt
+
+        layout = Struct('<' + fmt)
+        self.count = len(layout.unpack(bytes(layout.size)))
+
+        if decode is None:
+            decode = (lambda item: item) if self.count == 1 else (lambda *items: items)
+        if encode is None:
+            encode = (lambda value: (value,)) if self.count == 1 else tuple
+
+        self.decode = decode
+        self.encode = encode
+
+
+def string(size: int) -> Field:
+    # NOTE: matches Reader.read_string, the whole field is decoded and every null is dropped
+    return Field(
+        f'{size}s',
+        decode_string,
+        lambda value: (value.encode('cp949'),),
+    )
+
+
+def padding(size: int) -> Field:
+    return Field(f'{size}x')
+
+
+INT = Field('l')
+FLOAT = Field('f')
+
+
+class Schema:
+    """Record layout compiled once to a single cached struct.Struct. read() returns one value per
+    field that is not padding and write() takes them back in the same order. If size is given
+    the record is padded with zeros up to it, as the 1024 byte file headers are."""
+
+    def read(self, reader) -> Tuple[Any, ...]:
+        items = reader.read_struct(self.struct)
+        return tuple(decode(*items[start:stop]) for decode, start, stop in self._decoders)
+
+    def write(self, writer, values: Sequence[Any]):
+        items = []
+        for encode, value in zip(self._encoders, values):
+            items.extend(encode(value))
+        writer.write_struct(self.struct, items)
+
+    def __init__(self, *fields: Field, size: Optional[int] = None):
+        fmt = ''.join(field.fmt for field in fields)
+        if size is not None:
+            fmt += f'{size - Struct("<" + fmt).size}x'
+
+        self.struct = Struct('<' + fmt)
+        self.size = self.struct.size
+
+        self._decoders = []
+        self._encoders = []
+
+        start = 0
+        for field in fields:
+            if field.count == 0:
+                continue
+            self._decoders.append((field.decode, start, start + field.count))
+            self._encoders.append(field.encode)
+            start += field.count
@@ -1,9 +1,10 @@
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Any, List
+from typing import Any, List, Optional
 
 from .common import *
-from .reader import Reader
+from .reader import Reader, map_file
+from .schema import FLOAT, INT, Schema, padding, string
 from .writer import Writer
 
 
@@ -15,6 +16,32 @@ class MatPropType(IntEnum):
     NONE    = 4
 
 
+SKN_HEADER = Schema(
+    string(256),  # file type
+    string(256),  # msh name
+    INT,          # version
+    INT,          # materials
+    INT,          # body size
+    INT,          # fragments order
+    size=1024,
+)
+
+MATERIAL_RECORD = Schema(
+    string(256),  # name
+    string(256),  # effect
+    FLOAT,        # alpha
+    INT,          # alpha blend
+    padding(512 - 8),
+    INT,          # properties
+)
+
+PROPERTY_VALUE = {
+    MatPropType.INT: Schema(INT),
+    MatPropType.FLOAT: Schema(FLOAT),
+    MatPropType.VECTOR: Schema(VECTOR4D),
+}
+
+
 @dataclass
 class MaterialProperty:
     name: str
@@ -26,14 +53,8 @@ class MaterialProperty:
         name = reader.read_string(reader.read_int())
         prop_type = reader.read_int()
 
-        if prop_type == MatPropType.INT:
-            value = reader.read_int()
-
-        elif prop_type == MatPropType.FLOAT:
-            value = reader.read_float()
-
-        elif prop_type == MatPropType.VECTOR:
-            value = Vector4D.read(reader)
+        if prop_type in PROPERTY_VALUE:
+            value, = PROPERTY_VALUE[prop_type].read(reader)
 
         elif prop_type == MatPropType.TEXTURE:
             value = reader.read_string(reader.read_int())
@@ -50,19 +71,24 @@ class MaterialProperty:
             value,
         )
 
+    def calc_size(self) -> int:
+        size = 4 + Writer.string_size(self.name) + 4
+
+        if self.type in PROPERTY_VALUE:
+            size += PROPERTY_VALUE[self.type].size
+
+        elif self.type == MatPropType.TEXTURE:
+            size += 4 + Writer.string_size(self.value)
+
+        return size
+
     def write(self, writer: Writer):
         writer.write_int(len(self.name) + 1)
         writer.write_string(self.name)
         writer.write_int(self.type)
 
-        if self.type == MatPropType.INT:
-            writer.write_int(self.value)
-
-        elif self.type == MatPropType.FLOAT:
-            writer.write_float(self.value)
-
-        elif self.type == MatPropType.VECTOR:
-            self.value.write(writer)
+        if self.type in PROPERTY_VALUE:
+            PROPERTY_VALUE[self.type].write(writer, (self.value,))
 
         elif self.type == MatPropType.TEXTURE:
             writer.write_int(len(self.value) + 1)
@@ -79,15 +105,7 @@ class Material:
 
     @classmethod
     def read(cls, reader: Reader):
-        name = reader.read_string(256)
-        effect = reader.read_string(256)
-
-        alpha = reader.read_float()
-        alpha_blend = reader.read_int()
-
-        reader.read_bytes(512 - 8)
-
-        props_num = reader.read_int()
+        name, effect, alpha, alpha_blend, props_num = MATERIAL_RECORD.read(reader)
         props = [MaterialProperty.read(reader) for _ in range(props_num)]
 
         return cls(
@@ -98,71 +116,86 @@ class Material:
             props,
         )
 
+    def calc_size(self) -> int:
+        return MATERIAL_RECORD.size + sum(prop.calc_size() for prop in self.properties)
+
     def write(self, writer: Writer):
-        writer.write_string(self.name, 256)
-        writer.write_string(self.effect, 256)
+        MATERIAL_RECORD.write(writer, (self.name, self.effect, self.alpha, self.alpha_blend, len(self.properties)))
+        for prop in self.properties:
+            prop.write(writer)
 
-        writer.write_float(self.alpha)
-        writer.write_int(self.alpha_blend)
 
-        writer.write_bytes(b'\0' * (512 - 8))
+@dataclass
+class SKNInfo:
+    file_type: str
+    name: str
+    version: int
+    materials_num: int
 
-        writer.write_int(len(self.properties))
-        for prop in self.properties:
-            prop.write(writer)
+
+# probe reads only the file header, name is the MSH file the skin refers to
+def probe(filename: str) -> Optional[SKNInfo]:
+    with open(filename, mode="rb") as file:
+        data = file.read(SKN_HEADER.size)
+
+    if len(data) < SKN_HEADER.size:
+        return None
+
+    with Reader(data) as reader:
+        file_type, name, version, materials_num, body_size, fragments_order = SKN_HEADER.read(reader)
+
+    if not file_type.startswith("Eternity Engine Skin File"):
+        return None
+
+    return SKNInfo(file_type, name, version, materials_num)
 
 
 class SKN:
 
     def load_memory(self, data: bytes):
-        reader = Reader(data)
-
-        self.file_type = reader.read_string(256)
-        if not self.file_type.startswith("Eternity Engine Skin File"):
-            return
+        with Reader(data) as reader:
+            if reader.buffered() < SKN_HEADER.size:
+                return
 
-        self.name = reader.read_string(256)
-        self.version = reader.read_int()
+            header = SKN_HEADER.read(reader)
+            if not header[0].startswith("Eternity Engine Skin File"):
+                return
 
-        materials_num, body_size, fragments_order = reader.read_int(3)
+            self.file_type, self.name, self.version, materials_num, body_size, fragments_order = header
 
-        reader._pos = 1024
+            if self.version < 11:
+                self.materials = [Material.read(reader) for _ in range(materials_num)]
 
-        if self.version < 11:
-            self.materials = [Material.read(reader) for _ in range(materials_num)]
+            else:
+                fragments_indices = {
+                    0: (2, 3, 0, 4, 1),
+                    1: (1, 0, 4, 2, 3),
+                    2: (4, 3, 0, 1, 2),
+                    3: (3, 2, 1, 4, 0),
+                    4: (3, 2, 4, 0, 1),
+                }[fragments_order]
 
-        else:
-            fragments_indices = {
-                0: (2, 3, 0, 4, 1),
-                1: (1, 0, 4, 2, 3),
-                2: (4, 3, 0, 1, 2),
-                3: (3, 2, 1, 4, 0),
-                4: (3, 2, 4, 0, 1),
-            }[fragments_order]
+                fragment_size = body_size // 5 // 2 * 2
+                last_fragment_size = body_size - (fragment_size * 4)
 
-            fragment_size = body_size // 5 // 2 * 2
-            last_fragment_size = body_size - (fragment_size * 4)
+                fragments = []
+                for i in fragments_indices:
+                    size = last_fragment_size if i == 4 else fragment_size
+                    fragments.append(reader.read_bytes(size))
 
-            fragments = []
-            for i in fragments_indices:
-                size = last_fragment_size if i == 4 else fragment_size
-                fragments.append(reader.read_bytes(size))
+                order = sorted(range(len(fragments_indices)), key=lambda i: fragments_indices[i])
+                body = b''.join(fragments[idx] for idx in order)
 
-            body = b''
-            for idx in sorted(range(len(fragments_indices)), key=lambda i: fragments_indices[i]):
-                body += fragments[idx]
+                with Reader(body) as body_reader:
+                    self.materials = [Material.read(body_reader) for _ in range(materials_num)]
 
-            body_reader = Reader(body)
-            self.materials = [Material.read(body_reader) for _ in range(materials_num)]
+    def calc_size(self) -> int:
+        return SKN_HEADER.size + sum(material.calc_size() for material in self.materials)
 
     def save_memory(self) -> bytes:
-        writer = Writer()
+        writer = Writer(self.calc_size())
 
-        writer.write_string(self.file_type, 256)
-        writer.write_string(self.name, 256)
-        writer.write_int(self.version)
-        writer.write_int((len(self.materials), 0, 0))
-        writer.write_bytes(b'\0' * (512 - 16))
+        SKN_HEADER.write(writer, (self.file_type, self.name, self.version, len(self.materials), 0, 0))
 
         # TODO: version 11
         for material in self.materials:
@@ -171,8 +204,7 @@ class SKN:
         return writer.data
 
     def load_file(self, filename: str):
-        with open(filename, mode="rb") as file:
-            data = file.read()
+        with map_file(filename) as data:
             self.load_memory(data)
 
     def save_file(self, filename: str):
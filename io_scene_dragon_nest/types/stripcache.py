@@ -0,0 +1,154 @@
+import hashlib
+import os
+import numpy as np
+
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import List, Optional
+
+from .pyffi.utils import tristrip
+
+
+# _stripify_faces is run by StripCache in the worker processes too, the faces come and the strips go back as arrays;
+# it always stripifies serially, so a worker never starts a pool of its own
+def _stripify_faces(faces: np.ndarray, stitchstrips: bool) -> List[np.ndarray]:
+    return [np.asarray(strip, dtype=np.uint32) for strip in tristrip.stripify(faces.tolist(), stitchstrips)]
+
+
+# CACHE_VERSION is part of every key, bump it when a stripifier or the stored format changes so
+# that strips made by the old code are no longer found
+CACHE_VERSION = 1
+
+
+class StripCache:
+    """Stripify results by a hash of the triangle index buffer, the stitch flag and the stripifier
+    that made them. The most recently used results are kept in memory, and if directory is set every
+    result is stored there as well, so that it survives between sessions."""
+
+    # key hashes the faces as little-endian uint32 so lists and arrays of any int dtype hash alike
+    @staticmethod
+    def key(faces, stitchstrips: bool, variant: str = "") -> str:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(CACHE_VERSION.to_bytes(4, 'little'))
+        digest.update(np.ascontiguousarray(faces, dtype='<u4').tobytes())
+        digest.update(b'\x01' if stitchstrips else b'\x00')
+        digest.update(variant.encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def get(self, key: str) -> Optional[List[np.ndarray]]:
+        strips = self._entries.get(key)
+        if strips is not None:
+            self._entries.move_to_end(key)
+            return strips
+
+        if self.directory is None:
+            return None
+
+        try:
+            with np.load(self._path(key)) as data:
+                indices, lengths = data["indices"], data["lengths"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+        return self._remember(key, np.split(indices, np.cumsum(lengths)[:-1]))
+
+    def _put(self, key: str, strips) -> List[np.ndarray]:
+        strips = [np.asarray(strip, dtype=np.uint32) for strip in strips]
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            indices = np.concatenate(strips) if strips else np.empty(0, dtype=np.uint32)
+            lengths = np.array([len(strip) for strip in strips], dtype=np.int64)
+
+            # NOTE: written under a temporary name first, so readers never see half a file
+            temp_path = self._path(key) + ".tmp"
+            with open(temp_path, mode="wb") as file:
+                np.savez(file, indices=indices, lengths=lengths)
+            os.replace(temp_path, self._path(key))
+
+        return self._remember(key, strips)
+
+    def _remember(self, key: str, strips: List[np.ndarray]) -> List[np.ndarray]:
+        for strip in strips:
+            strip.flags.writeable = False
+
+        self._entries[key] = strips
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+        return strips
+
+    # _variant names the stripifier backend tristrip picks for the faces and how the faces were split up,
+    # the installed version is added for pytristrip, which changes independently of this add-on;
+    # clusters depend on the worker count and on the positions they are sorted by, so both are named
+    @staticmethod
+    def _variant(faces: np.ndarray, strip_workers: Optional[int], positions=None) -> str:
+        backend = tristrip.get_stripifier_name(len(faces))
+        if backend == 'pytristrip':
+            backend += "-" + str(getattr(tristrip.pytristrip, "__version__", ""))
+        if strip_workers == 1:
+            return backend + "/serial"
+
+        if positions is None:
+            layout = "faces"
+        else:
+            positions = np.ascontiguousarray(positions, dtype='<f8')
+            layout = hashlib.blake2b(positions.tobytes(), digest_size=8).hexdigest()
+        return f"{backend}/parallel-{strip_workers or os.cpu_count() or 1}-{layout}"
+
+    # stripify returns the cached strips of faces, only stripifying them the first time they are seen
+    def stripify(self, faces, stitchstrips=False, positions=None, strip_workers: Optional[int] = 1) -> List[np.ndarray]:
+        faces = np.asarray(faces).reshape(-1, 3)
+
+        key = self.key(faces, stitchstrips, self._variant(faces, strip_workers, positions))
+        strips = self.get(key)
+        if strips is not None:
+            return strips
+
+        if strip_workers == 1:
+            strips = _stripify_faces(faces, stitchstrips)
+        else:
+            strips = tristrip.stripify_parallel(faces, stitchstrips, positions, strip_workers)
+
+        return self._put(key, strips)
+
+    # stripify_all returns the strips of every faces array as stripify does, the ones not cached yet are made
+    # in a pool of max_workers processes, None for one per core, and then kept here like any other result
+    def stripify_all(self, faces_list, stitchstrips=False, max_workers: Optional[int] = None) -> List[List[np.ndarray]]:
+        faces_list = [np.asarray(faces).reshape(-1, 3) for faces in faces_list]
+        keys = [self.key(faces, stitchstrips, self._variant(faces, 1)) for faces in faces_list]
+        results = [self.get(key) for key in keys]
+
+        missing = [i for i, strips in enumerate(results) if strips is None]
+        stripify_faces = partial(_stripify_faces, stitchstrips=stitchstrips)
+        if len(missing) > 1 and max_workers != 1:
+            max_workers = min(max_workers or os.cpu_count() or 1, len(missing))
+            with ProcessPoolExecutor(max_workers, mp_context=tristrip.worker_context()) as pool:
+                made = list(pool.map(stripify_faces, [faces_list[i] for i in missing]))
+        else:
+            made = [stripify_faces(faces_list[i]) for i in missing]
+
+        for i, strips in zip(missing, made):
+            results[i] = self._put(keys[i], strips)
+
+        return results
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __init__(self, max_entries=64, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.directory = directory
+        self._entries = OrderedDict()
+
+
+# default_cache is used by Mesh.encode_indices, set its directory to keep strips on disk
+default_cache = StripCache()
@@ -1,18 +1,50 @@
+import numpy as np
+
 from collections.abc import Iterable
-from struct import pack
+from struct import Struct, calcsize, pack_into
 from typing import Tuple, Union
 
 
 class Writer:
 
+    # string_size returns the number of bytes write_string emits for the string
+    @staticmethod
+    def string_size(data: str, size=None) -> int:
+        null_size = 1 if size is None else size - len(data)
+        return len(data.encode('cp949')) + max(null_size, 0)
+
+    def tell(self) -> int:
+        return self._pos
+
+    # _reserve advances the position by size bytes and returns the start of the reserved range
+    def _reserve(self, size: int) -> int:
+        pos = self._pos
+        self._pos += size
+        if self._pos > len(self.data):
+            self.data.extend(bytes(self._pos - len(self.data)))
+        return pos
+
     def _write_value(self, data: Union[Union[float, int], Tuple[Union[float, int]]], fmt_char: str):
         if isinstance(data, Iterable):
-            self.data += pack(f'<{len(data)}{fmt_char}', *data)
+            fmt = f'<{len(data)}{fmt_char}'
+            pack_into(fmt, self.data, self._reserve(calcsize(fmt)), *data)
         else:
-            self.data += pack(f'<{fmt_char}', data)
+            fmt = f'<{fmt_char}'
+            pack_into(fmt, self.data, self._reserve(calcsize(fmt)), data)
+
+    # skip leaves size zero bytes, the buffer is never written behind the current position
+    def skip(self, size: int):
+        self._reserve(size)
 
     def write_bytes(self, data: bytes):
-        self.data += data
+        pos = self._reserve(len(data))
+        self.data[pos:self._pos] = data
+
+    # write_array writes the whole array converted to a little-endian numpy dtype (e.g. '<f4')
+    def write_array(self, data, dtype):
+        data = np.ascontiguousarray(data, dtype=dtype)
+        pos = self._reserve(data.nbytes)
+        self.data[pos:self._pos] = memoryview(data).cast('B')
 
     def write_float(self, data: Union[float, Tuple[float]]):
         self._write_value(data, 'f')
@@ -29,10 +61,32 @@ class Writer:
     def write_ushort(self, data: Union[int, Tuple[int]]):
         self._write_value(data, 'H')
 
+    def write_struct(self, layout: Struct, items):
+        layout.pack_into(self.data, self._reserve(layout.size), *items)
+
     def write_string(self, data: str, size=None):
-        self.data += data.encode('cp949')
+        self.write_bytes(data.encode('cp949'))
         null_size = 1 if size is None else size - len(data)
-        self.data += b'\00' * null_size
+        self.skip(max(null_size, 0))
+
+    def __init__(self, size=0):
+        self._pos = 0
+        self.data = bytearray(size)
+
+
+# Sections are (size, write_func) pairs in file order, write_func(writer) writes exactly size bytes
+
+def write_sections(sections) -> bytearray:
+    sections = list(sections)
+    writer = Writer(sum(size for size, _ in sections))
+    for _, write_func in sections:
+        write_func(writer)
+    return writer.data
+
 
-    def __init__(self):
-        self.data = b''
+# stream_sections writes each section to the file as soon as it is built, so only one section is held in memory
+def stream_sections(file, sections):
+    for size, write_func in sections:
+        writer = Writer(size)
+        write_func(writer)
+        file.write(writer.data)